@@ -1,5 +1,5 @@
-import requests
-import time
+import aiohttp
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 import base64
@@ -10,6 +10,9 @@ from app.config import config
 
 logger = logging.getLogger(__name__)
 
+# Seconds between solution polls against the CAPTCHA service
+POLL_INTERVAL = 5
+
 class CaptchaSolver:
     """Handles CAPTCHA solving using 2Captcha or Anti-Captcha services"""
     
@@ -23,17 +26,34 @@ class CaptchaSolver:
             self.base_url = "https://api.anti-captcha.com"
         else:
             raise ValueError(f"Unsupported CAPTCHA service: {self.service}")
+        
+        # One pooled session for every call to the service, created on first use in the running loop
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Shared keep-alive session for the CAPTCHA service"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+                limit=64, limit_per_host=8, ttl_dns_cache=300, keepalive_timeout=30
+            ))
+        return self._session
     
-    def solve_image_captcha(self, image_data: bytes) -> Optional[str]:
+    async def aclose(self):
+        """Close the shared session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def solve_image_captcha(self, image_data: bytes) -> Optional[str]:
         """
         Solve image-based CAPTCHA
         Returns the solved text or None if failed
         """
         try:
             if self.service == "2captcha":
-                return self._solve_2captcha_image(image_data)
+                return await self._solve_2captcha_image(image_data)
             elif self.service == "anticaptcha":
-                return self._solve_anticaptcha_image(image_data)
+                return await self._solve_anticaptcha_image(image_data)
             else:
                 logger.error(f"Unsupported CAPTCHA service: {self.service}")
                 return None
@@ -42,16 +62,16 @@ class CaptchaSolver:
             logger.error(f"Error solving image CAPTCHA: {e}")
             return None
     
-    def solve_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
+    async def solve_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
         """
         Solve reCAPTCHA
         Returns the solved token or None if failed
         """
         try:
             if self.service == "2captcha":
-                return self._solve_2captcha_recaptcha(site_key, page_url)
+                return await self._solve_2captcha_recaptcha(site_key, page_url)
             elif self.service == "anticaptcha":
-                return self._solve_anticaptcha_recaptcha(site_key, page_url)
+                return await self._solve_anticaptcha_recaptcha(site_key, page_url)
             else:
                 logger.error(f"Unsupported CAPTCHA service: {self.service}")
                 return None
@@ -60,7 +80,14 @@ class CaptchaSolver:
             logger.error(f"Error solving reCAPTCHA: {e}")
             return None
     
-    def _solve_2captcha_image(self, image_data: bytes) -> Optional[str]:
+    async def _request_json(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Issue a request to the CAPTCHA service and decode its JSON reply"""
+        async with session.request(method, url, **kwargs) as response:
+            response.raise_for_status()
+            # 2Captcha answers JSON with a text/html content type
+            return await response.json(content_type=None)
+    
+    async def _solve_2captcha_image(self, image_data: bytes) -> Optional[str]:
         """Solve image CAPTCHA using 2Captcha"""
         try:
             # Encode image to base64
@@ -74,10 +101,8 @@ class CaptchaSolver:
                 'json': 1
             }
             
-            response = requests.post(f"{self.base_url}/in.php", data=submit_data)
-            response.raise_for_status()
-            
-            result = response.json()
+            session = await self._get_session()
+            result = await self._request_json(session, 'POST', f"{self.base_url}/in.php", data=submit_data)
             if result.get('status') != 1:
                 logger.error(f"2Captcha submission failed: {result}")
                 return None
@@ -85,8 +110,8 @@ class CaptchaSolver:
             captcha_id = result['request']
             
             # Wait for solution
-            for _ in range(30):  # Wait up to 5 minutes
-                time.sleep(10)
+            for _ in range(60):  # Wait up to 5 minutes
+                await asyncio.sleep(POLL_INTERVAL)
                 
                 check_data = {
                     'key': self.api_key,
@@ -95,10 +120,7 @@ class CaptchaSolver:
                     'json': 1
                 }
                 
-                response = requests.get(f"{self.base_url}/res.php", params=check_data)
-                response.raise_for_status()
-                
-                result = response.json()
+                result = await self._request_json(session, 'GET', f"{self.base_url}/res.php", params=check_data)
                 if result.get('status') == 1:
                     logger.info("2Captcha image solved successfully")
                     return result['request']
@@ -115,7 +137,7 @@ class CaptchaSolver:
             logger.error(f"Error in 2Captcha image solving: {e}")
             return None
     
-    def _solve_2captcha_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
+    async def _solve_2captcha_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
         """Solve reCAPTCHA using 2Captcha"""
         try:
             # Submit reCAPTCHA
@@ -127,10 +149,8 @@ class CaptchaSolver:
                 'json': 1
             }
             
-            response = requests.post(f"{self.base_url}/in.php", data=submit_data)
-            response.raise_for_status()
-            
-            result = response.json()
+            session = await self._get_session()
+            result = await self._request_json(session, 'POST', f"{self.base_url}/in.php", data=submit_data)
             if result.get('status') != 1:
                 logger.error(f"2Captcha reCAPTCHA submission failed: {result}")
                 return None
@@ -138,8 +158,8 @@ class CaptchaSolver:
             captcha_id = result['request']
             
             # Wait for solution
-            for _ in range(60):  # Wait up to 10 minutes for reCAPTCHA
-                time.sleep(10)
+            for _ in range(120):  # Wait up to 10 minutes for reCAPTCHA
+                await asyncio.sleep(POLL_INTERVAL)
                 
                 check_data = {
                     'key': self.api_key,
@@ -148,10 +168,7 @@ class CaptchaSolver:
                     'json': 1
                 }
                 
-                response = requests.get(f"{self.base_url}/res.php", params=check_data)
-                response.raise_for_status()
-                
-                result = response.json()
+                result = await self._request_json(session, 'GET', f"{self.base_url}/res.php", params=check_data)
                 if result.get('status') == 1:
                     logger.info("2Captcha reCAPTCHA solved successfully")
                     return result['request']
@@ -168,7 +185,7 @@ class CaptchaSolver:
             logger.error(f"Error in 2Captcha reCAPTCHA solving: {e}")
             return None
     
-    def _solve_anticaptcha_image(self, image_data: bytes) -> Optional[str]:
+    async def _solve_anticaptcha_image(self, image_data: bytes) -> Optional[str]:
         """Solve image CAPTCHA using Anti-Captcha"""
         try:
             # Encode image to base64
@@ -183,10 +200,8 @@ class CaptchaSolver:
                 }
             }
             
-            response = requests.post(f"{self.base_url}/createTask", json=submit_data)
-            response.raise_for_status()
-            
-            result = response.json()
+            session = await self._get_session()
+            result = await self._request_json(session, 'POST', f"{self.base_url}/createTask", json=submit_data)
             if result.get('errorId') != 0:
                 logger.error(f"Anti-Captcha submission failed: {result}")
                 return None
@@ -194,18 +209,15 @@ class CaptchaSolver:
             task_id = result['taskId']
             
             # Wait for solution
-            for _ in range(30):  # Wait up to 5 minutes
-                time.sleep(10)
+            for _ in range(60):  # Wait up to 5 minutes
+                await asyncio.sleep(POLL_INTERVAL)
                 
                 check_data = {
                     'clientKey': self.api_key,
                     'taskId': task_id
                 }
                 
-                response = requests.post(f"{self.base_url}/getTaskResult", json=check_data)
-                response.raise_for_status()
-                
-                result = response.json()
+                result = await self._request_json(session, 'POST', f"{self.base_url}/getTaskResult", json=check_data)
                 if result.get('status') == 'ready':
                     logger.info("Anti-Captcha image solved successfully")
                     return result['solution']['text']
@@ -222,7 +234,7 @@ class CaptchaSolver:
             logger.error(f"Error in Anti-Captcha image solving: {e}")
             return None
     
-    def _solve_anticaptcha_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
+    async def _solve_anticaptcha_recaptcha(self, site_key: str, page_url: str) -> Optional[str]:
         """Solve reCAPTCHA using Anti-Captcha"""
         try:
             # Submit reCAPTCHA
@@ -235,10 +247,8 @@ class CaptchaSolver:
                 }
             }
             
-            response = requests.post(f"{self.base_url}/createTask", json=submit_data)
-            response.raise_for_status()
-            
-            result = response.json()
+            session = await self._get_session()
+            result = await self._request_json(session, 'POST', f"{self.base_url}/createTask", json=submit_data)
             if result.get('errorId') != 0:
                 logger.error(f"Anti-Captcha reCAPTCHA submission failed: {result}")
                 return None
@@ -246,18 +256,15 @@ class CaptchaSolver:
             task_id = result['taskId']
             
             # Wait for solution
-            for _ in range(60):  # Wait up to 10 minutes for reCAPTCHA
-                time.sleep(10)
+            for _ in range(120):  # Wait up to 10 minutes for reCAPTCHA
+                await asyncio.sleep(POLL_INTERVAL)
                 
                 check_data = {
                     'clientKey': self.api_key,
                     'taskId': task_id
                 }
                 
-                response = requests.post(f"{self.base_url}/getTaskResult", json=check_data)
-                response.raise_for_status()
-                
-                result = response.json()
+                result = await self._request_json(session, 'POST', f"{self.base_url}/getTaskResult", json=check_data)
                 if result.get('status') == 'ready':
                     logger.info("Anti-Captcha reCAPTCHA solved successfully")
                     return result['solution']['gRecaptchaResponse']
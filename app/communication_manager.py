@@ -1,26 +1,40 @@
 import logging
 import json
-from typing import Dict, Any, Optional, List
+from collections import Counter, defaultdict
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Set, Union
 from datetime import datetime
 from pathlib import Path
 
 from app.config import config
 from app.phase2_models import (
-    ClientInteraction, InteractionStatus, EngagementMessage,
+    ClientInteraction, InteractionStatus, PaymentStatus, EngagementMessage,
     CredentialsRequest, OwnerNotification
 )
 from app.utils import data_manager
 
 logger = logging.getLogger(__name__)
 
+# Entries kept inline on each interaction; older ones are spilled to a per-client JSONL file
+COMMUNICATION_LOG_MAX_ENTRIES = 32
+
 class CommunicationManager:
     """Manages all client communication for Phase 2 workflow"""
     
     def __init__(self):
         self.interactions_file = Path("data/phase2_interactions.jsonl")
         self.interactions_file.parent.mkdir(exist_ok=True)
+        self.communication_log_dir = Path("data/communication_logs")
         self.interactions: Dict[str, ClientInteraction] = {}
+        
+        # status -> business_site_ids, so status queries and counts don't scan every interaction
+        self.status_index: Dict[InteractionStatus, Set[str]] = defaultdict(set)
+        self._indexed_status: Dict[str, InteractionStatus] = {}
+        self.payment_counts: Counter = Counter()
+        self._indexed_payment: Dict[str, PaymentStatus] = {}
+        
         self._load_interactions()
+        for interaction in self.interactions.values():
+            self._index_interaction(interaction)
     
     def _load_interactions(self):
         """Load existing interactions from file"""
@@ -29,8 +43,7 @@ class CommunicationManager:
                 with open(self.interactions_file, 'r') as f:
                     for line in f:
                         if line.strip():
-                            data = json.loads(line)
-                            interaction = ClientInteraction(**data)
+                            interaction = ClientInteraction.model_validate_json(line)
                             self.interactions[interaction.business_site_id] = interaction
                 logger.info(f"Loaded {len(self.interactions)} existing interactions")
             except Exception as e:
@@ -40,13 +53,73 @@ class CommunicationManager:
         """Save interaction to file"""
         try:
             with open(self.interactions_file, 'a') as f:
-                f.write(interaction.json() + '\n')
+                f.write(interaction.model_dump_json() + '\n')
         except Exception as e:
             logger.error(f"Error saving interaction: {e}")
     
+    def _log_communication(self, interaction: ClientInteraction, message_type: str, message: str):
+        """Append to the interaction's communication log, spilling the oldest entries to disk"""
+        interaction.communication_log.append({
+            "date": datetime.now().isoformat(),
+            "type": message_type,
+            "message": message
+        })
+        
+        overflow = len(interaction.communication_log) - COMMUNICATION_LOG_MAX_ENTRIES
+        if overflow > 0:
+            spilled = interaction.communication_log[:overflow]
+            del interaction.communication_log[:overflow]
+            try:
+                self.communication_log_dir.mkdir(parents=True, exist_ok=True)
+                with open(self.communication_log_dir / f"{interaction.business_site_id}.jsonl", 'a') as f:
+                    f.writelines(json.dumps(entry) + '\n' for entry in spilled)
+            except Exception as e:
+                logger.error(f"Error archiving communication log: {e}")
+    
+    def get_communication_history(self, business_site_id: str) -> List[Dict[str, Any]]:
+        """Get the full communication log, including entries archived to disk"""
+        interaction = self.interactions.get(business_site_id)
+        if not interaction:
+            return []
+        
+        history = []
+        archive_file = self.communication_log_dir / f"{business_site_id}.jsonl"
+        if archive_file.exists():
+            try:
+                with open(archive_file, 'r') as f:
+                    history = [json.loads(line) for line in f if line.strip()]
+            except Exception as e:
+                logger.error(f"Error loading communication log archive: {e}")
+        
+        return history + list(interaction.communication_log)
+    
+    def _index_interaction(self, interaction: ClientInteraction):
+        """Bring the status index and payment counters in line with an interaction"""
+        business_site_id = interaction.business_site_id
+        
+        previous = self._indexed_status.get(business_site_id)
+        if previous != interaction.status:
+            if previous is not None:
+                self.status_index[previous].discard(business_site_id)
+            self.status_index[interaction.status].add(business_site_id)
+            self._indexed_status[business_site_id] = interaction.status
+        
+        previous_payment = self._indexed_payment.get(business_site_id)
+        if previous_payment != interaction.payment_status:
+            if previous_payment is not None:
+                self.payment_counts[previous_payment] -= 1
+            self.payment_counts[interaction.payment_status] += 1
+            self._indexed_payment[business_site_id] = interaction.payment_status
+    
+    def transition(self, interaction: ClientInteraction, status: InteractionStatus):
+        """Change an interaction's status outside this manager, keeping the status index current"""
+        interaction.mark(status)
+        self._index_interaction(interaction)
+    
     def _update_interaction(self, interaction: ClientInteraction):
         """Update existing interaction"""
         self.interactions[interaction.business_site_id] = interaction
+        self._index_interaction(interaction)
         self._save_interaction(interaction)
     
     def start_interaction(self, business_site_id: str, domain: str, 
@@ -64,10 +137,11 @@ class CommunicationManager:
             initial_seo_issues=seo_issues or [],
             initial_seo_recommendations=seo_recommendations or [],
             status=InteractionStatus.INITIAL_OUTREACH,
-            initial_outreach_date=datetime.now()
+            status_timestamps={InteractionStatus.INITIAL_OUTREACH: datetime.now()}
         )
         
         self.interactions[business_site_id] = interaction
+        self._index_interaction(interaction)
         self._save_interaction(interaction)
         
         logger.info(f"✅ Interaction started for {domain}")
@@ -102,14 +176,9 @@ Best regards,
 The Rankzen Team"""
 
         # Log the engagement message
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "engagement_sent",
-            "message": engagement_body
-        })
+        self._log_communication(interaction, "engagement_sent", engagement_body)
         
-        interaction.status = InteractionStatus.ENGAGEMENT_SENT
-        interaction.engagement_sent_date = datetime.now()
+        interaction.mark(InteractionStatus.ENGAGEMENT_SENT)
         self._update_interaction(interaction)
         
         logger.info(f"✅ Engagement message sent to {interaction.domain}")
@@ -122,13 +191,9 @@ The Rankzen Team"""
             return {"success": False, "error": "Interaction not found"}
         
         # Log the response
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "client_response",
-            "message": response_text
-        })
+        self._log_communication(interaction, "client_response", response_text)
         
-        interaction.client_response_date = datetime.now()
+        interaction.mark(InteractionStatus.CLIENT_RESPONDED)
         interaction.client_response_text = response_text
         
         # Analyze response for positive intent
@@ -138,8 +203,7 @@ The Rankzen Team"""
         is_positive = any(keyword in response_lower for keyword in positive_keywords)
         
         if is_positive:
-            interaction.status = InteractionStatus.AGREED_TO_HELP
-            interaction.agreement_date = datetime.now()
+            interaction.mark(InteractionStatus.AGREED_TO_HELP)
             self._update_interaction(interaction)
             
             logger.info(f"✅ Client agreed to help for {interaction.domain}")
@@ -150,7 +214,6 @@ The Rankzen Team"""
                 "message": "Client agreed to proceed with SEO improvements"
             }
         else:
-            interaction.status = InteractionStatus.CLIENT_RESPONDED
             self._update_interaction(interaction)
             
             logger.info(f"📝 Client responded but didn't agree for {interaction.domain}")
@@ -182,14 +245,13 @@ What's included:
 
 Let us know when you've completed the payment!"""
 
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "payment_link_sent",
-            "message": payment_message
-        })
+        self._log_communication(interaction, "payment_link_sent", payment_message)
         
         interaction.payment_link = payment_link
-        interaction.status = InteractionStatus.PAYMENT_LINK_SENT
+        # Links from PaymentHandler carry client_reference_id=<business_site_id>, which the
+        # pending sweep uses to find this client's completed checkout session
+        interaction.stripe_client_reference_id = business_site_id
+        interaction.mark(InteractionStatus.PAYMENT_LINK_SENT)
         self._update_interaction(interaction)
         
         logger.info(f"✅ Payment link sent to {interaction.domain}")
@@ -215,42 +277,24 @@ We'll securely store these and use them only for implementing your SEO fixes.
 
 You can reply with the details or let us know if you need help finding them."""
 
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "credentials_requested",
-            "message": credentials_message
-        })
+        self._log_communication(interaction, "credentials_requested", credentials_message)
         
-        interaction.status = InteractionStatus.CREDENTIALS_REQUESTED
-        interaction.credentials_requested_date = datetime.now()
+        interaction.mark(InteractionStatus.CREDENTIALS_REQUESTED)
         self._update_interaction(interaction)
         
         logger.info(f"✅ Credentials requested from {interaction.domain}")
         return True
     
-    def collect_credentials(self, business_site_id: str, 
-                          website_url: str, username: str, password: str,
-                          cms_login_url: str = None, notes: str = None) -> bool:
-        """Collect and store client credentials"""
+    def collect_credentials(self, business_site_id: str, website_url: str) -> bool:
+        """Record that client credentials were collected (they're stored by CredentialsManager)"""
         interaction = self.interactions.get(business_site_id)
         if not interaction:
             return False
         
-        # Store credentials (in production, this should be encrypted)
-        interaction.website_url = website_url
-        interaction.cms_login_url = cms_login_url
-        interaction.username = username
-        interaction.password_encrypted = password  # In production, encrypt this
-        interaction.credentials_notes = notes
-        interaction.credentials_collected_date = datetime.now()
-        interaction.status = InteractionStatus.CREDENTIALS_COLLECTED
+        interaction.mark(InteractionStatus.CREDENTIALS_COLLECTED)
         
         # Log credential collection (without sensitive data)
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "credentials_collected",
-            "message": f"Credentials collected for {website_url}"
-        })
+        self._log_communication(interaction, "credentials_collected", f"Credentials collected for {website_url}")
         
         self._update_interaction(interaction)
         
@@ -289,19 +333,13 @@ Please review your website and let us know if any adjustments are needed.
 
 We're here to make sure you're completely satisfied!"""
 
-        interaction.communication_log.append({
-            "date": datetime.now().isoformat(),
-            "type": "completion_notification",
-            "message": completion_message
-        })
+        self._log_communication(interaction, "completion_notification", completion_message)
         
-        interaction.status = InteractionStatus.OWNER_NOTIFIED
-        interaction.owner_notified_date = datetime.now()
+        interaction.mark(InteractionStatus.OWNER_NOTIFIED)
         interaction.final_message_sent = completion_message
         
         if qa_approved:
-            interaction.completion_date = datetime.now()
-            interaction.status = InteractionStatus.COMPLETED
+            interaction.mark(InteractionStatus.COMPLETED)
         
         self._update_interaction(interaction)
         
@@ -316,9 +354,32 @@ We're here to make sure you're completely satisfied!"""
         """Get all interactions"""
         return list(self.interactions.values())
     
-    def get_interactions_by_status(self, status: InteractionStatus) -> List[ClientInteraction]:
-        """Get interactions by status"""
-        return [i for i in self.interactions.values() if i.status == status]
+    def get_interaction_count(self) -> int:
+        """Get the number of interactions"""
+        return len(self.interactions)
+    
+    def get_status_counts(self) -> Dict[InteractionStatus, int]:
+        """Get the number of interactions in each status"""
+        return {status: len(self.status_index.get(status, ())) for status in InteractionStatus}
+    
+    def get_payment_counts(self) -> Dict[PaymentStatus, int]:
+        """Get the number of interactions in each payment status"""
+        return {status: self.payment_counts[status] for status in PaymentStatus}
+    
+    def iter_interactions_by_status(self, statuses: Union[InteractionStatus, Iterable[InteractionStatus]]) -> Iterator[ClientInteraction]:
+        """Yield interactions in any of the given statuses (uses the status index)"""
+        if isinstance(statuses, InteractionStatus):
+            statuses = (statuses,)
+        for status in statuses:
+            # Snapshot the ids: the caller may transition interactions while iterating
+            for business_site_id in tuple(self.status_index.get(status, ())):
+                interaction = self.interactions.get(business_site_id)
+                if interaction is not None and interaction.status == status:
+                    yield interaction
+    
+    def get_interactions_by_status(self, statuses: Union[InteractionStatus, Iterable[InteractionStatus]]) -> List[ClientInteraction]:
+        """Get interactions in any of the given statuses (uses the status index)"""
+        return list(self.iter_interactions_by_status(statuses))
 
 # Global instance
 communication_manager = CommunicationManager()
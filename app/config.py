@@ -22,9 +22,12 @@ class Config:
     STRIPE_PUBLISHABLE_KEY: str = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
     STRIPE_PRODUCT_KEY: str = os.getenv("STRIPE_PRODUCT_KEY", "")
     STRIPE_WEBHOOK_SECRET: str = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    STRIPE_PRICE_ID: str = os.getenv("STRIPE_PRICE_ID", "")  # Reusable $100 SEO package price
+    STRIPE_PAYMENT_LINK_URL: str = os.getenv("STRIPE_PAYMENT_LINK_URL", "")  # Shared hosted payment link
     
     # Phase 2 Configuration (Simplified)
     QA_REVIEWER_EMAIL: str = os.getenv("QA_REVIEWER_EMAIL", "reviewer@rankzen.com")
+    SIMULATE_LATENCY: float = float(os.getenv("SIMULATE_LATENCY", "0"))  # Seconds of fake CMS delay per implemented change (demos only)
     
 
     
@@ -33,6 +36,16 @@ class Config:
     QPS_PER_DOMAIN: int = int(os.getenv("QPS_PER_DOMAIN", "2"))
     DAILY_AUDITS: int = int(os.getenv("DAILY_AUDITS", "150"))
     MAX_SITES_PER_RUN: int = int(os.getenv("MAX_SITES_PER_RUN", "30"))
+    AUDIT_WORKERS: int = int(os.getenv("AUDIT_WORKERS", "3"))
+    SUBMIT_WORKERS: int = int(os.getenv("SUBMIT_WORKERS", "2"))
+    SERP_CACHE_TTL: int = int(os.getenv("SERP_CACHE_TTL", "86400"))  # Seconds a Serper result is reused from disk; 0 disables the cache
+    DNS_CACHE_ENABLED: bool = os.getenv("DNS_CACHE_ENABLED", "false").lower() == "true"  # Opt-in; patches socket.getaddrinfo for the whole process
+    DNS_CACHE_TTL: int = int(os.getenv("DNS_CACHE_TTL", "300"))  # Seconds to reuse a host lookup when the cache is enabled
+    PLAYWRIGHT_PAGES: int = int(os.getenv("PLAYWRIGHT_PAGES", "2"))
+    PLAYWRIGHT_USER_DATA_DIR: str = os.getenv("PLAYWRIGHT_USER_DATA_DIR", "")  # Opt-in persistent profile; one directory per running process
+    PLAYWRIGHT_CDP_URL: str = os.getenv("PLAYWRIGHT_CDP_URL", "")  # e.g. http://127.0.0.1:9222 to share one running Chrome
+    PLAYWRIGHT_HEADLESS_SHELL: bool = os.getenv("PLAYWRIGHT_HEADLESS_SHELL", "true").lower() == "true"  # Lightweight headless-shell build; false runs full Chromium headless
+    PLAYWRIGHT_BLOCK_RESOURCES: bool = os.getenv("PLAYWRIGHT_BLOCK_RESOURCES", "true").lower() == "true"  # Set false for sites that break without CSS
     
     # Target Industries (Rankzen focus)
     TARGET_INDUSTRIES: List[str] = os.getenv("TARGET_INDUSTRIES", "landscaping,real_estate,plumbers,hvac,roofers,lawyers").split(",")
@@ -45,6 +58,7 @@ class Config:
     
     # Test Sites (live)
     TEST_SITES: List[str] = os.getenv("TEST_SITES", "sentra.one,hyperpool.io").split(",")
+    TEST_MODE_LOW_SCORE: bool = os.getenv("TEST_MODE_LOW_SCORE", "true").lower() == "true"  # Force a low audit score for test-keyword domains
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
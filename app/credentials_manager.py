@@ -22,8 +22,24 @@ class CredentialsManager:
         self.encryption_key = self._get_or_create_encryption_key()
         self.cipher_suite = Fernet(self.encryption_key)
         
+        # Ids with stored credentials, so existence checks don't rescan the file
+        self.stored_ids = self._load_stored_ids()
+        
         logger.info("✅ Credentials manager initialized with encryption")
     
+    def _load_stored_ids(self) -> set:
+        """Collect business ids that have a credentials record on disk"""
+        stored_ids = set()
+        if self.credentials_file.exists():
+            try:
+                with open(self.credentials_file, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            stored_ids.add(json.loads(line).get('business_site_id'))
+            except Exception as e:
+                logger.error(f"Error loading credentials index: {e}")
+        return stored_ids
+    
     def _get_or_create_encryption_key(self) -> bytes:
         """Get existing encryption key or create new one"""
         key_file = Path("data/encryption.key")
@@ -87,6 +103,7 @@ class CredentialsManager:
             # Save to file
             with open(self.credentials_file, 'a') as f:
                 f.write(json.dumps(credentials_record) + '\n')
+            self.stored_ids.add(business_site_id)
             
             logger.info(f"✅ Credentials stored for {business_site_id}")
             return True
@@ -163,6 +180,7 @@ class CredentialsManager:
             with open(self.credentials_file, 'w') as f:
                 for record in records:
                     f.write(json.dumps(record) + '\n')
+            self.stored_ids.discard(business_site_id)
             
             logger.info(f"✅ Credentials deleted for {business_site_id}")
             return True
@@ -202,22 +220,7 @@ class CredentialsManager:
     
     def validate_credentials(self, business_site_id: str) -> bool:
         """Check if credentials exist for a business"""
-        try:
-            if not self.credentials_file.exists():
-                return False
-            
-            with open(self.credentials_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        record = json.loads(line)
-                        if record.get('business_site_id') == business_site_id:
-                            return True
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"❌ Error validating credentials: {e}")
-            return False
+        return business_site_id in self.stored_ids
     
     def get_credentials_summary(self) -> Dict[str, Any]:
         """Get summary of stored credentials"""
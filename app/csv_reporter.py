@@ -1,3 +1,4 @@
+import atexit
 import csv
 import logging
 from datetime import datetime
@@ -9,6 +10,35 @@ from app.config import config
 
 logger = logging.getLogger(__name__)
 
+# Columns of the CSV log, in order
+CSV_FIELDNAMES = [
+    # Site Information
+    'Domain', 'Business Name', 'URL', 'Business Type', 'Region',
+    
+    # SEO Audit Results
+    'Overall SEO Score', 'Title Score', 'Description Score', 'Speed Score', 
+    'Mobile Score', 'Accessibility Score',
+    
+    # SEO Issues & Recommendations
+    'SEO Issues', 'SEO Recommendations', 'Load Time (seconds)',
+    
+    # AI Report
+    'AI Report Subject', 'AI Report Message', 'Report Generated',
+    
+    # Contact Form Results
+    'Contact Form Found', 'Form URL', 'Submission Status', 'Submission Error',
+    
+    # CAPTCHA Information
+    'CAPTCHA Detected', 'CAPTCHA Type', 'CAPTCHA Solved',
+    
+    # Campaign Data
+    'Discovery Date', 'Audit Date', 'Outreach Date', 'Blacklisted',
+    
+    # Additional Metrics
+    'Page Size (KB)', 'Images Count', 'Images With Alt', 'Links Count', 
+    'Broken Links Count', 'H1 Count', 'Meta Description Length'
+]
+
 class CSVReporter:
     """Generates and maintains a single comprehensive CSV report for SEO outreach campaigns"""
     
@@ -17,6 +47,44 @@ class CSVReporter:
         self.data_dir.mkdir(exist_ok=True)
         self.csv_file = self.data_dir / "seo_outreach_log.csv"
         
+        # While a batch is open, rows are held here and written with one append at commit_batch
+        self._batch_depth = 0
+        self._pending_rows: List[Dict[str, Any]] = []
+        atexit.register(self._flush_at_exit)
+    
+    def begin_batch(self):
+        """Hold new rows in memory until the matching commit_batch"""
+        self._batch_depth += 1
+    
+    def commit_batch(self):
+        """Close a batch; the outermost commit writes every held row"""
+        self._batch_depth = max(0, self._batch_depth - 1)
+        if self._batch_depth or not self._pending_rows:
+            return
+        try:
+            self._write_rows(self._pending_rows)
+            self._pending_rows.clear()
+        except Exception as e:
+            logger.error(f"❌ Error writing CSV log rows: {e}")
+    
+    def _flush_at_exit(self):
+        """Write rows still held by an open batch"""
+        self._batch_depth = min(self._batch_depth, 1)
+        self.commit_batch()
+    
+    def _write_rows(self, rows: List[Dict[str, Any]]):
+        """Append rows to the CSV file, writing the header first if the file is new"""
+        file_exists = self.csv_file.exists()
+        with open(self.csv_file, 'a', newline='', encoding='utf-8', buffering=1 << 16) as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+            
+            # Write header only if file is new
+            if not file_exists:
+                writer.writeheader()
+                logger.info(f"📊 Created new CSV log file: {self.csv_file}")
+            
+            writer.writerows(rows)
+        
     def add_site_log(self, 
                     site: BusinessSite,
                     seo_score: Optional[SEOScore] = None,
@@ -25,38 +93,6 @@ class CSVReporter:
         """
         Add a single site log to the CSV file (creates file if it doesn't exist)
         """
-        # Define fieldnames for the CSV
-        fieldnames = [
-            # Site Information
-            'Domain', 'Business Name', 'URL', 'Business Type', 'Region',
-            
-            # SEO Audit Results
-            'Overall SEO Score', 'Title Score', 'Description Score', 'Speed Score', 
-            'Mobile Score', 'Accessibility Score',
-            
-            # SEO Issues & Recommendations
-            'SEO Issues', 'SEO Recommendations', 'Load Time (seconds)',
-            
-            # AI Report
-            'AI Report Subject', 'AI Report Message', 'Report Generated',
-            
-            # Contact Form Results
-            'Contact Form Found', 'Form URL', 'Submission Status', 'Submission Error',
-            
-            # CAPTCHA Information
-            'CAPTCHA Detected', 'CAPTCHA Type', 'CAPTCHA Solved',
-            
-            # Campaign Data
-            'Discovery Date', 'Audit Date', 'Outreach Date', 'Blacklisted',
-            
-            # Additional Metrics
-            'Page Size (KB)', 'Images Count', 'Images With Alt', 'Links Count', 
-            'Broken Links Count', 'H1 Count', 'Meta Description Length'
-        ]
-        
-        # Check if file exists to determine if we need to write header
-        file_exists = self.csv_file.exists()
-        
         # Prepare data for the new row
         seo_issues = ""
         seo_recommendations = ""
@@ -150,17 +186,11 @@ class CSVReporter:
             'Meta Description Length': seo_score.meta_description_length if seo_score else 0
         }
         
-        # Write to CSV file
-        with open(self.csv_file, 'a', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            # Write header only if file is new
-            if not file_exists:
-                writer.writeheader()
-                logger.info(f"📊 Created new CSV log file: {self.csv_file}")
-            
-            # Write the row
-            writer.writerow(row)
+        # Write to CSV file (or hold it for the open batch)
+        if self._batch_depth:
+            self._pending_rows.append(row)
+        else:
+            self._write_rows([row])
         
         logger.info(f"✅ Added site log to CSV: {site.domain}")
         return str(self.csv_file)
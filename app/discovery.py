@@ -1,8 +1,13 @@
 import requests
+import asyncio
+import hashlib
+import json
 import logging
+import os
 import time
 import random
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator
 from urllib.parse import urlparse, quote_plus
 from app.models import BusinessSite
 from app.config import config
@@ -10,6 +15,9 @@ from app.config import config
 
 logger = logging.getLogger(__name__)
 
+# Serper responses by query, reused across cycles for config.SERP_CACHE_TTL seconds
+SERP_CACHE_DIR = Path("data/serp_cache")
+
 def extract_domain(url: str) -> str:
     """Extract domain from URL"""
     try:
@@ -36,9 +44,17 @@ class BusinessDiscovery:
         """
         Discover local business websites using industry-specific search terms
         """
-        logger.info(f"🔍 Starting business discovery for {max_sites} sites")
+        discovered_sites = list(self.iter_businesses(max_sites=max_sites, industry=industry))
         
-        discovered_sites = []
+        logger.info(f"✅ Discovered {len(discovered_sites)} business sites")
+        return discovered_sites
+    
+    def iter_businesses(self, max_sites: int = 30, industry: str = None) -> Iterator[BusinessSite]:
+        """
+        Yield discovered business sites as each industry's search completes,
+        so callers can start on the first sites while later industries are still being searched
+        """
+        logger.info(f"🔍 Starting business discovery for {max_sites} sites")
         
         # Always try to discover businesses (with fallback if Serper API fails)
         logger.info(f"🔑 Using Serper API key: {self.serper_api_key[:10]}...")
@@ -51,21 +67,18 @@ class BusinessDiscovery:
             sites_per_industry = max(1, max_sites // len(config.TARGET_INDUSTRIES))
             target_industries = config.TARGET_INDUSTRIES
         
+        remaining = max_sites
         for target_industry in target_industries:
             logger.info(f"🎯 Discovering {target_industry} businesses")
             industry_sites = self._discover_industry_businesses(
                 industry=target_industry,
                 max_sites=sites_per_industry
-            )
-            discovered_sites.extend(industry_sites)
+            )[:remaining]
+            yield from industry_sites
+            remaining -= len(industry_sites)
             
-            if len(discovered_sites) >= max_sites:
+            if remaining <= 0:
                 break
-        
-
-        
-        logger.info(f"✅ Discovered {len(discovered_sites)} business sites")
-        return discovered_sites[:max_sites]
     
     def _discover_industry_businesses(self, industry: str, max_sites: int = 5) -> List[BusinessSite]:
         """Discover businesses for a specific industry"""
@@ -137,39 +150,77 @@ class BusinessDiscovery:
                 'hl': 'en'
             }
             
-            response = requests.post(
-                'https://google.serper.dev/search',
-                headers=headers,
-                json=data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                results = response.json()
-                businesses = []
-                
-                if 'organic' in results:
-                    for result in results['organic'][:5]:  # Limit to 5 results
-                        if 'link' in result and 'title' in result:
-                            domain = extract_domain(result['link'])
-                            if domain and not self._is_excluded_domain(domain):
-                                businesses.append({
-                                    'name': result['title'][:50],  # Truncate long titles
-                                    'domain': domain,
-                                    'url': result['link']
-                                })
-                
-                logger.info(f"✅ Found {len(businesses)} businesses via Serper API")
-                return businesses
-                
+            cache_file = self._serp_cache_file(data)
+            results = self._load_cached_serp(cache_file)
+            if results is not None:
+                logger.debug("Serper cache hit for %s", query)
             else:
-                logger.warning(f"⚠️ Serper API error: {response.status_code} - {response.text}")
-                return []
+                response = requests.post(
+                    'https://google.serper.dev/search',
+                    headers=headers,
+                    json=data,
+                    timeout=30
+                )
                 
+                if response.status_code != 200:
+                    logger.warning(f"⚠️ Serper API error: {response.status_code} - {response.text}")
+                    return []
+                
+                results = response.json()
+                self._store_serp(cache_file, response.content)
+            
+            businesses = []
+            
+            if 'organic' in results:
+                for result in results['organic'][:5]:  # Limit to 5 results
+                    if 'link' in result and 'title' in result:
+                        domain = extract_domain(result['link'])
+                        if domain and not self._is_excluded_domain(domain):
+                            businesses.append({
+                                'name': result['title'][:50],  # Truncate long titles
+                                'domain': domain,
+                                'url': result['link']
+                            })
+            
+            logger.info(f"✅ Found {len(businesses)} businesses via Serper API")
+            return businesses
+            
         except Exception as e:
             logger.warning(f"⚠️ Serper API error: {e}")
             return []
     
+    @staticmethod
+    def _serp_cache_file(payload: Dict[str, Any]) -> Path:
+        """Cache file for a Serper request payload"""
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        return SERP_CACHE_DIR / key[:2] / f"{key}.json"
+    
+    @staticmethod
+    def _load_cached_serp(cache_file: Path) -> Optional[Dict[str, Any]]:
+        """Cached Serper response, or None if missing or older than the TTL"""
+        if config.SERP_CACHE_TTL <= 0:
+            return None
+        try:
+            if time.time() - cache_file.stat().st_mtime > config.SERP_CACHE_TTL:
+                return None
+            with open(cache_file, 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _store_serp(cache_file: Path, body: bytes):
+        """Write a Serper response to the cache (atomically, so readers never see half a file)"""
+        if config.SERP_CACHE_TTL <= 0:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            tmp_file.write_bytes(body)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.debug("Could not cache Serper response: %s", e)
+    
     def _is_site_accessible(self, url: str) -> bool:
         """Quick check if a site is accessible before adding to audit list"""
         try:
@@ -517,3 +568,28 @@ class RateLimiter:
                 time.sleep(sleep_time)
         
         self.domain_calls[domain] = now
+
+class HostRateLimiter:
+    """Async token-bucket rate limiter keyed by host, so different hosts never wait on each other"""
+    
+    def __init__(self, rate: float = 2, burst: int = 1):
+        self.rate = rate  # tokens per second, per host
+        self.burst = burst
+        self.buckets: Dict[str, tuple] = {}  # host -> (tokens, last_refill)
+        self.locks: Dict[str, asyncio.Lock] = {}
+    
+    async def acquire(self, host: str):
+        """Wait until a request to this host is allowed"""
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        
+        async with lock:
+            now = time.monotonic()
+            tokens, last_refill = self.buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last_refill) * self.rate)
+            
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / self.rate)
+                now = time.monotonic()
+                tokens = 1
+            
+            self.buckets[host] = (tokens - 1, now)
@@ -1,6 +1,6 @@
 import requests
+import asyncio
 import logging
-import time
 from typing import Dict, List, Optional, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
@@ -13,6 +13,8 @@ from app.captcha_solver import CaptchaSolver
 
 logger = logging.getLogger(__name__)
 
+_CAPTCHA_INPUT_RE = re.compile(r'captcha', re.I)
+
 class FormSubmitter:
     """Handles automatic form submission with CAPTCHA solving"""
     
@@ -23,7 +25,7 @@ class FormSubmitter:
         })
         self.captcha_solver = CaptchaSolver()
     
-    def submit_contact_form(self, site: BusinessSite, message: OutreachMessage) -> ContactForm:
+    async def submit_contact_form(self, site: BusinessSite, message: OutreachMessage) -> ContactForm:
         """
         Submit contact form for a business site
         Returns ContactForm with submission results
@@ -40,7 +42,7 @@ class FormSubmitter:
             logger.info(f"Submitting contact form for {site.domain}")
             
             # Get the form page
-            response = self.session.get(form_url, timeout=15)
+            response = await asyncio.to_thread(self.session.get, form_url, timeout=15)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -61,7 +63,7 @@ class FormSubmitter:
             
             # Handle CAPTCHA if present
             if captcha_info['has_captcha']:
-                captcha_solution = self._handle_captcha(captcha_info, form_url, soup)
+                captcha_solution = await self._handle_captcha(captcha_info, form_url, soup)
                 if captcha_solution:
                     form_data.update(captcha_solution)
                 else:
@@ -74,7 +76,7 @@ class FormSubmitter:
             
             # Submit the form
             submit_url = self._get_submit_url(form, form_url)
-            submit_response = self.session.post(submit_url, data=form_data, timeout=15)
+            submit_response = await asyncio.to_thread(self.session.post, submit_url, data=form_data, timeout=15)
             
             # Check submission result
             success = self._check_submission_success(submit_response)
@@ -85,6 +87,7 @@ class FormSubmitter:
                 has_captcha=captcha_info['has_captcha'],
                 captcha_type=captcha_info.get('type'),
                 submitted=success,
+                submission_attempted=True,
                 error_message=None if success else "Form submission failed"
             )
             
@@ -233,27 +236,27 @@ class FormSubmitter:
         
         return None
     
-    def _handle_captcha(self, captcha_info: Dict[str, Any], form_url: str, soup: BeautifulSoup) -> Optional[Dict[str, str]]:
+    async def _handle_captcha(self, captcha_info: Dict[str, Any], form_url: str, soup: BeautifulSoup) -> Optional[Dict[str, str]]:
         """Handle CAPTCHA solving"""
         try:
             if captcha_info['type'] == 'recaptcha':
                 site_key = captcha_info['site_key']
                 if site_key:
-                    solution = self.captcha_solver.solve_recaptcha(site_key, form_url)
+                    solution = await self.captcha_solver.solve_recaptcha(site_key, form_url)
                     if solution:
                         return {'g-recaptcha-response': solution}
             
             elif captcha_info['type'] == 'image':
                 image_src = captcha_info['image_src']
                 if image_src:
-                    # Download CAPTCHA image
+                    # Download CAPTCHA image (through the session so it matches the form's cookies)
                     image_url = urljoin(form_url, image_src)
-                    image_response = self.session.get(image_url)
+                    image_response = await asyncio.to_thread(self.session.get, image_url, timeout=15)
                     if image_response.status_code == 200:
-                        solution = self.captcha_solver.solve_image_captcha(image_response.content)
+                        solution = await self.captcha_solver.solve_image_captcha(image_response.content)
                         if solution:
                             # Find the CAPTCHA input field
-                            captcha_input = soup.find('input', attrs={'name': re.compile(r'captcha', re.I)})
+                            captcha_input = soup.find('input', attrs={'name': _CAPTCHA_INPUT_RE})
                             if captcha_input:
                                 return {captcha_input['name']: solution}
             
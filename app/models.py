@@ -68,6 +68,7 @@ class ContactForm(BaseModel):
     has_captcha: bool = False
     captcha_type: Optional[str] = None
     submitted: bool = False
+    submission_attempted: bool = False  # The form was posted, so it must not be sent again even if unconfirmed
     submission_date: Optional[datetime] = None
     error_message: Optional[str] = None
 
@@ -1,11 +1,11 @@
+import asyncio
 import logging
-import time
 from typing import List, Dict, Any
 from datetime import datetime
 
 from app.config import config
 from app.models import BusinessSite, SEOScore, AuditResult, ContactForm, OutreachMessage
-from app.discovery import BusinessDiscovery
+from app.discovery import BusinessDiscovery, HostRateLimiter
 from app.seo_audit import SEOAuditor
 from app.ai_reporter import AIReporter
 from app.form_submitter import FormSubmitter
@@ -22,8 +22,9 @@ class SEOOutreachOrchestrator:
         self.auditor = SEOAuditor()
         self.reporter = AIReporter()
         self.form_submitter = FormSubmitter()
+        self.host_limiter = HostRateLimiter(rate=config.QPS_PER_DOMAIN)
     
-    def run_phase1_outreach(self, max_sites: int = None) -> Dict[str, Any]:
+    async def run_phase1_outreach(self, max_sites: int = None) -> Dict[str, Any]:
         """
         Run complete Phase 1 outreach process
         This automated agent:
@@ -53,72 +54,18 @@ class SEOOutreachOrchestrator:
         try:
             # Step 1: Automatically discover under-optimized local business websites
             logger.info("🔍 Step 1: Discovering under-optimized local business websites...")
-            discovered_sites = self.discovery.discover_businesses(max_sites)
+            discovered_sites = await asyncio.to_thread(self.discovery.discover_businesses, max_sites)
             results['discovered_sites'] = len(discovered_sites)
             
             if not discovered_sites:
                 logger.warning("❌ No under-optimized local business websites discovered")
                 return results
             
-            # Step 2: Perform SEO audits on discovered sites
+            # Step 2 + 3: Audit sites and submit outreach as a pipeline, so a site's
+            # form submission overlaps with the next site's audit
             logger.info("📊 Step 2: Performing SEO audits on discovered sites...")
-            audited_sites = []
-            
-            for site in discovered_sites:
-                try:
-                    logger.info(f"🔍 Auditing {site.domain}")
-                    seo_score = self.auditor.audit_site(site)
-                    site.seo_score = seo_score
-                    site.audit_status = 'completed'
-                    audited_sites.append(site)
-                    results['audited_sites'] += 1
-                    
-                    # Rate limiting
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error auditing {site.domain}: {e}")
-                    results['errors'].append(f"Audit error for {site.domain}: {str(e)}")
-                    site.audit_status = 'failed'
-            
-            # Step 3: Generate AI reports and submit outreach
             logger.info("🤖 Step 3: Generating AI reports and submitting outreach...")
-            
-            for site in audited_sites:
-                try:
-                    if not site.seo_score or site.seo_score.overall_score == 0:
-                        logger.warning(f"⏭️  Skipping {site.domain} - no valid SEO score")
-                        results['skipped_sites'] += 1
-                        continue
-                    
-                    # Generate AI-powered plain-English report
-                    logger.info(f"🤖 Generating AI report for {site.domain}")
-                    outreach_message = self.reporter.generate_outreach_message(site, site.seo_score)
-                    
-                    # Submit outreach via contact form
-                    logger.info(f"📝 Submitting outreach for {site.domain}")
-                    contact_form = self.form_submitter.submit_contact_form(site, outreach_message)
-                    
-                    if contact_form.submitted:
-                        # Mark as sent and add to blacklist
-                        site.outreach_sent = True
-                        site.outreach_date = datetime.now()
-                        data_manager.add_to_blacklist(site.domain)
-                        results['successful_submissions'] += 1
-                        results['outreach_sent'] += 1
-                        
-                        logger.info(f"✅ Successfully sent outreach to {site.domain}")
-                    else:
-                        results['failed_submissions'] += 1
-                        logger.error(f"❌ Failed to submit form for {site.domain}: {contact_form.error_message}")
-                    
-                    # Rate limiting between submissions
-                    time.sleep(5)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error processing {site.domain}: {e}")
-                    results['errors'].append(f"Processing error for {site.domain}: {str(e)}")
-                    results['failed_submissions'] += 1
+            audited_sites = await self._run_audit_submit_pipeline(discovered_sites, results)
             
             # Generate CSV reports
             try:
@@ -171,7 +118,106 @@ class SEOOutreachOrchestrator:
             results['end_time'] = datetime.now().isoformat()
             return results
     
-    def run_single_site_outreach(self, url: str) -> Dict[str, Any]:
+    async def _run_audit_submit_pipeline(self, sites: List[BusinessSite], results: Dict[str, Any]) -> List[BusinessSite]:
+        """
+        Run audits and submissions as two concurrent stages connected by queues.
+        Audit workers feed audited sites onto the submit queue as soon as each audit finishes.
+        """
+        audit_q: asyncio.Queue = asyncio.Queue()
+        submit_q: asyncio.Queue = asyncio.Queue()
+        audited_sites: List[BusinessSite] = []
+        
+        for site in sites:
+            audit_q.put_nowait(site)
+        
+        async def audit_worker():
+            while True:
+                site = await audit_q.get()
+                try:
+                    if await self._audit_stage(site, results):
+                        audited_sites.append(site)
+                        await submit_q.put(site)
+                finally:
+                    audit_q.task_done()
+        
+        async def submit_worker():
+            while True:
+                site = await submit_q.get()
+                try:
+                    await self._submit_stage(site, results)
+                finally:
+                    submit_q.task_done()
+        
+        workers = [asyncio.create_task(audit_worker()) for _ in range(max(1, config.AUDIT_WORKERS))]
+        workers += [asyncio.create_task(submit_worker()) for _ in range(max(1, config.SUBMIT_WORKERS))]
+        
+        try:
+            await audit_q.join()
+            await submit_q.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        return audited_sites
+    
+    async def _audit_stage(self, site: BusinessSite, results: Dict[str, Any]) -> bool:
+        """Audit a single site; returns True if it should move on to submission"""
+        try:
+            # Rate limiting (per host, so other sites are not held up)
+            await self.host_limiter.acquire(site.domain)
+            
+            logger.info(f"🔍 Auditing {site.domain}")
+            seo_score = await asyncio.to_thread(self.auditor.audit_site, site)
+            site.seo_score = seo_score
+            site.audit_status = 'completed'
+            results['audited_sites'] += 1
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Error auditing {site.domain}: {e}")
+            results['errors'].append(f"Audit error for {site.domain}: {str(e)}")
+            site.audit_status = 'failed'
+            return False
+    
+    async def _submit_stage(self, site: BusinessSite, results: Dict[str, Any]):
+        """Generate the AI report and submit outreach for an audited site"""
+        try:
+            if not site.seo_score or site.seo_score.overall_score == 0:
+                logger.warning(f"⏭️  Skipping {site.domain} - no valid SEO score")
+                results['skipped_sites'] += 1
+                return
+            
+            # Generate AI-powered plain-English report
+            logger.info(f"🤖 Generating AI report for {site.domain}")
+            outreach_message = await asyncio.to_thread(self.reporter.generate_outreach_message, site, site.seo_score)
+            
+            # Rate limiting between requests to the same host
+            await self.host_limiter.acquire(site.domain)
+            
+            # Submit outreach via contact form
+            logger.info(f"📝 Submitting outreach for {site.domain}")
+            contact_form = await self.form_submitter.submit_contact_form(site, outreach_message)
+            
+            if contact_form.submitted:
+                # Mark as sent and add to blacklist
+                site.outreach_sent = True
+                site.outreach_date = datetime.now()
+                await asyncio.to_thread(data_manager.add_to_blacklist, site.domain)
+                results['successful_submissions'] += 1
+                results['outreach_sent'] += 1
+                
+                logger.info(f"✅ Successfully sent outreach to {site.domain}")
+            else:
+                results['failed_submissions'] += 1
+                logger.error(f"❌ Failed to submit form for {site.domain}: {contact_form.error_message}")
+            
+        except Exception as e:
+            logger.error(f"❌ Error processing {site.domain}: {e}")
+            results['errors'].append(f"Processing error for {site.domain}: {str(e)}")
+            results['failed_submissions'] += 1
+    
+    async def run_single_site_outreach(self, url: str) -> Dict[str, Any]:
         """
         Run outreach for a single site (for testing or manual input)
         """
@@ -191,12 +237,12 @@ class SEOOutreachOrchestrator:
                 }
             
             # Find contact form
-            contact_forms = self.discovery.find_contact_forms(url)
+            contact_forms = await asyncio.to_thread(self.discovery.find_contact_forms, url)
             if contact_forms:
                 site.contact_form_url = contact_forms[0]
             
             # Audit site
-            seo_score = self.auditor.audit_site(site)
+            seo_score = await asyncio.to_thread(self.auditor.audit_site, site)
             site.seo_score = seo_score
             
             if not seo_score or seo_score.overall_score == 0:
@@ -207,16 +253,16 @@ class SEOOutreachOrchestrator:
                 }
             
             # Generate outreach message
-            outreach_message = self.reporter.generate_outreach_message(site, seo_score)
+            outreach_message = await asyncio.to_thread(self.reporter.generate_outreach_message, site, seo_score)
             
             # Submit form
-            contact_form = self.form_submitter.submit_contact_form(site, outreach_message)
+            contact_form = await self.form_submitter.submit_contact_form(site, outreach_message)
             
             # Add to CSV log
             csv_reporter.add_site_log(site, seo_score, outreach_message, contact_form)
             
             if contact_form.submitted:
-                data_manager.add_to_blacklist(domain)
+                await asyncio.to_thread(data_manager.add_to_blacklist, domain)
                 return {
                     'success': True,
                     'domain': domain,
@@ -242,15 +288,13 @@ class SEOOutreachOrchestrator:
     
     def get_outreach_stats(self) -> Dict[str, Any]:
         """Get statistics about outreach activities"""
-        logs = data_manager.load_logs()
-        blacklist = data_manager.load_blacklist()
-        
+        # Counts and recent entries are kept in memory by data_manager; the log file isn't re-read
         stats = {
-            'total_blacklisted_domains': len(blacklist),
-            'total_log_entries': len(logs),
-            'successful_submissions': len([log for log in logs if log.get('action') == 'FORM_SUBMISSION' and log.get('status') == 'SUCCESS']),
-            'failed_submissions': len([log for log in logs if log.get('action') == 'FORM_SUBMISSION' and log.get('status') in ['FAILED', 'ERROR']]),
-            'recent_activity': logs[-10:] if logs else []  # Last 10 activities
+            'total_blacklisted_domains': len(data_manager.load_blacklist()),
+            'total_log_entries': data_manager.log_count,
+            'successful_submissions': data_manager.count_logs('FORM_SUBMISSION', ('SUCCESS',)),
+            'failed_submissions': data_manager.count_logs('FORM_SUBMISSION', ('FAILED', 'ERROR')),
+            'recent_activity': data_manager.get_recent_logs(10)  # Last 10 activities
         }
         
         return stats
@@ -1,19 +1,151 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import json
 import logging
-import stripe
-from typing import Dict, Any, Optional
+import os
+import re
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
 
 from app.config import config
+from app.utils import retry_async
 from app.phase2_models import PaymentRequest, PaymentResponse, PaymentStatus
 
 logger = logging.getLogger(__name__)
 
+# How long a non-terminal checkout session status is trusted before re-fetching
+SESSION_CACHE_TTL = 60
+SESSION_CACHE_MAX_SIZE = 10000
+
+# Verified webhook events waiting for the background consumer
+WEBHOOK_QUEUE_MAX_SIZE = 1000
+
+# Accepted events are journaled before Stripe gets its 200, and marked done once handled;
+# anything still pending at startup (crash, failed handler) is queued again
+WEBHOOK_JOURNAL_FILE = Path("data/webhook_events.jsonl")
+
+# Stripe redelivers events for up to 3 days, so remember processed ids that long
+WEBHOOK_DEDUP_TTL = 72 * 3600
+WEBHOOK_DEDUP_MAX_SIZE = 100000
+
+# Real Stripe events are a few KiB; anything larger is rejected before signature checks
+WEBHOOK_MAX_PAYLOAD_BYTES = 65_536
+
+# Same replay window Stripe's SDK uses for signed webhook timestamps
+WEBHOOK_TOLERANCE = 300
+
+# Event types _dispatch_event acts on; anything else is acknowledged without verification
+HANDLED_EVENT_TYPES = frozenset({
+    b'checkout.session.completed',
+    b'payment_intent.succeeded',
+    b'payment_intent.payment_failed'
+})
+_EVENT_TYPE_RE = re.compile(rb'"type"\s*:\s*"([^"]+)"')
+
+# Blocking Stripe calls run on this many threads, each holding one pooled connection
+STRIPE_MAX_WORKERS = 4
+
+# Price of the standard SEO package; only this amount can use the preconfigured price/link
+DEFAULT_PACKAGE_AMOUNT = 10000
+
+REDIRECT_TMPL = 'https://rankzen.com/payment-success?business_id=%s&t=%s'
+
+# Headers for whatever serves /payment-success: the page is per-customer and must never
+# be cached by a CDN/shared proxy or replayed from browser history
+PAYMENT_SUCCESS_HEADERS = {
+    'Cache-Control': 'no-store, private',
+    'Pragma': 'no-cache',
+    'Vary': 'Cookie'
+}
+
+# Signed redirect tokens expire at a day boundary at least this far out; snapping to whole
+# days keeps retried PaymentLink.create params identical for the idempotency key
+PAYMENT_SUCCESS_TOKEN_TTL = 7 * 24 * 3600
+
+def _success_token_expiry() -> int:
+    """Expiry timestamp for redirect tokens issued now"""
+    return (int(time.time()) // 86400 + 1) * 86400 + PAYMENT_SUCCESS_TOKEN_TTL
+
+def _with_client_reference(url: str, business_site_id: str) -> str:
+    """Add client_reference_id to a payment link URL, keeping any query it already has"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != 'client_reference_id']
+    query.append(('client_reference_id', business_site_id))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def _success_token(business_site_id: str, expires: int) -> str:
+    """Signed '<expires>.<mac>' token binding a payment-success redirect to one business"""
+    key = hashlib.sha256(b"payment-success:" + config.STRIPE_SECRET_KEY.encode()).digest()
+    mac = hmac.new(key, f"{business_site_id}.{expires}".encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{expires}.{mac}"
+
+def _payment_link_data(business_site_id: str, amount: int, description: Optional[str],
+                       expires: int) -> Dict[str, Any]:
+    """Build PaymentLink.create params; only the per-business leaves vary between calls"""
+    if config.STRIPE_PRICE_ID and amount == DEFAULT_PACKAGE_AMOUNT:
+        # Reuse the existing price instead of creating a product+price per business
+        line_item = {'price': config.STRIPE_PRICE_ID, 'quantity': 1}
+    else:
+        # Note: Using product_data instead of product key for dynamic product creation
+        line_item = {
+            'price_data': {
+                'currency': 'usd',
+                'product_data': {
+                    'name': 'SEO Improvement Package',
+                    'description': description or 'SEO improvements for %s' % business_site_id
+                },
+                'unit_amount': amount,  # $100 in cents
+            },
+            'quantity': 1,
+        }
+    
+    return {
+        'line_items': [line_item],
+        'after_completion': {
+            'type': 'redirect',
+            'redirect': {'url': REDIRECT_TMPL % (quote(business_site_id), _success_token(business_site_id, expires))}
+        },
+        'metadata': {
+            'business_site_id': business_site_id,
+            'service': 'seo_improvements'
+        }
+    }
+
 class PaymentHandler:
     """Handles Stripe payment processing for Phase 2"""
     
     def __init__(self):
-        self.stripe = stripe
-        self.stripe.api_key = config.STRIPE_SECRET_KEY
+        # The stripe SDK is slow to import, so it's loaded on first use (see `stripe` below)
+        self._stripe = None
+        self.http_session: Optional[requests.Session] = None
+        
+        # Dedicated pool for blocking Stripe SDK calls, so webhook bursts don't
+        # starve the event loop's default executor
+        self.executor = ThreadPoolExecutor(max_workers=STRIPE_MAX_WORKERS, thread_name_prefix="stripe")
+        
+        # session_id -> (fetched_at, session); paid sessions are terminal and never re-fetched
+        self.session_cache: Dict[str, tuple] = {}
+        
+        # Webhook events are verified in-band and handled by a background consumer
+        self.event_queue: asyncio.Queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_MAX_SIZE)
+        self.event_consumer: Optional[asyncio.Task] = None
+        
+        # event_id -> first seen (monotonic); payment_intent_id -> business_site_id
+        self.seen_events: Dict[str, float] = {}
+        self.payment_bindings: Dict[str, str] = {}
+        
+        # Keyed HMAC state is computed once; each verification copies it
+        self.webhook_hmac = (
+            hmac.new(config.STRIPE_WEBHOOK_SECRET.encode(), digestmod=hashlib.sha256)
+            if config.STRIPE_WEBHOOK_SECRET else None
+        )
         
         # Configure Stripe with publishable key
         if config.STRIPE_PUBLISHABLE_KEY:
@@ -21,60 +153,163 @@ class PaymentHandler:
         else:
             logger.warning("⚠️ Stripe publishable key not configured")
     
-    def create_payment_link(self, business_site_id: str, amount: int = 10000, 
+    @property
+    def stripe(self):
+        """Stripe SDK module, imported and configured on first access"""
+        if self._stripe is None:
+            import stripe
+            stripe.api_key = config.STRIPE_SECRET_KEY
+            
+            # One keep-alive session for all Stripe calls, so the TLS handshake is paid once
+            # per connection instead of per request. Retries are done by _call, with backoff.
+            self.http_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=STRIPE_MAX_WORKERS)
+            self.http_session.mount("https://", adapter)
+            stripe.default_http_client = stripe.http_client.RequestsClient(session=self.http_session)
+            stripe.max_network_retries = 0
+            
+            self._stripe = stripe
+        return self._stripe
+    
+    async def _call(self, func, *args, **kwargs):
+        """Run a blocking Stripe SDK call on the Stripe thread pool, retrying transient failures"""
+        loop = asyncio.get_running_loop()
+        
+        async def attempt():
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        
+        # Connection drops and rate limits are worth retrying (POSTs carry idempotency keys);
+        # auth and invalid-request errors fail fast
+        return await retry_async(
+            attempt,
+            retry_on=(self.stripe.error.APIConnectionError, self.stripe.error.RateLimitError,
+                      requests.ConnectionError, TimeoutError)
+        )
+    
+    def _cache_session(self, session_id: str, session: Any):
+        """Remember the latest known state of a checkout session"""
+        self.session_cache.pop(session_id, None)
+        if len(self.session_cache) >= SESSION_CACHE_MAX_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            self.session_cache.pop(next(iter(self.session_cache)))
+        self.session_cache[session_id] = (time.monotonic(), session)
+    
+    async def _retrieve_session(self, session_id: str) -> Any:
+        """Retrieve a checkout session, reusing cached results where still valid"""
+        cached = self.session_cache.get(session_id)
+        if cached:
+            fetched_at, session = cached
+            if session.get('payment_status') == 'paid' or time.monotonic() - fetched_at < SESSION_CACHE_TTL:
+                return session
+        
+        session = await self._call(self.stripe.checkout.Session.retrieve, session_id)
+        self._cache_session(session_id, session)
+        return session
+    
+    def _idempotency_key(self, *parts: Any) -> str:
+        """Deterministic Idempotency-Key so retried Stripe POSTs are deduplicated server-side"""
+        return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+    
+    async def create_payment_link(self, business_site_id: str, amount: int = DEFAULT_PACKAGE_AMOUNT, 
                           description: str = None) -> Optional[str]:
         """Create a Stripe payment link for $100 SEO package"""
         try:
+            # Standard package: tag the shared hosted link instead of calling Stripe
+            if config.STRIPE_PAYMENT_LINK_URL and amount == DEFAULT_PACKAGE_AMOUNT and not description:
+                return _with_client_reference(config.STRIPE_PAYMENT_LINK_URL, business_site_id)
+            
             if not config.STRIPE_SECRET_KEY or config.STRIPE_SECRET_KEY == "":
                 logger.error("❌ Stripe secret key not configured")
                 return None
             
             # Create payment link
-            payment_link_data = {
-                'line_items': [{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': 'SEO Improvement Package',
-                            'description': description or f'SEO improvements for {business_site_id}'
-                        },
-                        'unit_amount': amount,  # $100 in cents
-                    },
-                    'quantity': 1,
-                }],
-                'after_completion': {
-                    'type': 'redirect',
-                    'redirect': {
-                        'url': f'https://rankzen.com/payment-success?business_id={business_site_id}'
-                    }
-                },
-                'metadata': {
-                    'business_site_id': business_site_id,
-                    'service': 'seo_improvements'
-                }
-            }
+            expires = _success_token_expiry()
+            payment_link_data = _payment_link_data(business_site_id, amount, description, expires)
             
-            # Note: Using product_data instead of product key for dynamic product creation
-            
-            payment_link = self.stripe.PaymentLink.create(**payment_link_data)
+            idempotency_key = self._idempotency_key(business_site_id, "paylink", amount, expires)
+            payment_link = await self._call(
+                self.stripe.PaymentLink.create, idempotency_key=idempotency_key, **payment_link_data
+            )
             
             logger.info(f"✅ Payment link created for {business_site_id}: {payment_link.url}")
-            return payment_link.url
+            # Checkout sessions opened from a tagged link carry the reference, so payments can be looked up per business
+            return _with_client_reference(payment_link.url, business_site_id)
             
-        except stripe.error.StripeError as e:
+        except self.stripe.error.StripeError as e:
             logger.error(f"❌ Stripe error creating payment link: {e}")
             return None
         except Exception as e:
             logger.error(f"❌ Error creating payment link: {e}")
             return None
     
-    def verify_payment(self, session_id: str) -> Dict[str, Any]:
+    def verify_success_token(self, business_site_id: str, token: str) -> bool:
+        """Check a payment-success redirect token (serve the page with PAYMENT_SUCCESS_HEADERS)"""
+        expires, _, _ = (token or '').partition('.')
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(token, _success_token(business_site_id, int(expires)))
+    
+    async def create_payment_links_batch(self, business_site_ids: List[str], concurrency: int = 5,
+                                         timeout: float = 60) -> Dict[str, Optional[str]]:
+        """Create payment links for many businesses with bounded concurrency"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def create_one(business_site_id: str) -> Optional[str]:
+            async with semaphore:
+                return await asyncio.wait_for(self.create_payment_link(business_site_id), timeout=timeout)
+        
+        results = await asyncio.gather(*(create_one(i) for i in business_site_ids), return_exceptions=True)
+        
+        payment_links: Dict[str, Optional[str]] = {}
+        for business_site_id, result in zip(business_site_ids, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Error creating payment link for {business_site_id}: {result!r}")
+                result = None
+            payment_links[business_site_id] = result
+        
+        logger.info(f"✅ Created {sum(1 for url in payment_links.values() if url)}/{len(business_site_ids)} payment links")
+        return payment_links
+    
+    async def find_completed_sessions(self, reference_ids: List[str],
+                                      since: Optional[datetime] = None) -> Dict[str, str]:
+        """Map client_reference_id -> completed checkout session id, from one paged session listing"""
+        wanted = set(reference_ids)
+        if not wanted or not config.STRIPE_SECRET_KEY:
+            return {}
+        
+        params: Dict[str, Any] = {'status': 'complete', 'limit': 100}
+        if since:
+            params['created'] = {'gte': int(since.timestamp())}
+        
+        def scan() -> Dict[str, Any]:
+            # Newest first, so the first session seen per reference is its latest
+            found = {}
+            for session in self.stripe.checkout.Session.list(**params).auto_paging_iter():
+                reference = session.get('client_reference_id')
+                if reference in wanted and reference not in found:
+                    found[reference] = session
+                    if len(found) == len(wanted):
+                        break
+            return found
+        
+        try:
+            found = await self._call(scan)
+        except Exception as e:
+            logger.error(f"❌ Error listing checkout sessions: {e}")
+            return {}
+        
+        # verify_payment will retrieve these next; the listing already has their state
+        for session in found.values():
+            self._cache_session(session.id, session)
+        return {reference: session.id for reference, session in found.items()}
+    
+    async def verify_payment(self, session_id: str) -> Dict[str, Any]:
         """Verify payment completion using session ID"""
         try:
             if not config.STRIPE_SECRET_KEY:
                 return {"success": False, "error": "Stripe not configured"}
             
-            session = self.stripe.checkout.Session.retrieve(session_id)
+            session = await self._retrieve_session(session_id)
             
             if session.payment_status == 'paid':
                 return {
@@ -92,108 +327,261 @@ class PaymentHandler:
                     "error": "Payment not completed"
                 }
                 
-        except stripe.error.StripeError as e:
+        except self.stripe.error.StripeError as e:
             logger.error(f"❌ Stripe error verifying payment: {e}")
             return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"❌ Error verifying payment: {e}")
             return {"success": False, "error": str(e)}
     
-    def process_webhook(self, payload: bytes, sig_header: str) -> Dict[str, Any]:
+    async def process_webhook(self, payload: bytes, sig_header: str) -> Dict[str, Any]:
         """Process Stripe webhook events"""
         try:
+            if len(payload) > WEBHOOK_MAX_PAYLOAD_BYTES:
+                logger.warning(f"⚠️ Webhook payload too large: {len(payload)} bytes")
+                return {"success": False, "error": "payload too large"}
+            
+            if isinstance(payload, str):
+                payload = payload.encode()
+            
+            # Cheap prescan: events we'd drop anyway skip HMAC + JSON parsing. Nested objects
+            # have "type" fields too, so only skip when no "type" value is one we handle.
+            if HANDLED_EVENT_TYPES.isdisjoint(_EVENT_TYPE_RE.findall(payload)):
+                return {"success": True, "handled": False}
+            
             if not config.STRIPE_WEBHOOK_SECRET:
                 logger.warning("⚠️ Stripe webhook secret not configured")
                 return {"success": False, "error": "Webhook secret not configured"}
             
-            event = self.stripe.Webhook.construct_event(
-                payload, sig_header, config.STRIPE_WEBHOOK_SECRET
-            )
+            event = self._construct_event(payload, sig_header)
             
-            # Handle different event types
-            if event['type'] == 'checkout.session.completed':
-                return self._handle_checkout_completed(event['data']['object'])
-            elif event['type'] == 'payment_intent.succeeded':
-                return self._handle_payment_succeeded(event['data']['object'])
-            elif event['type'] == 'payment_intent.payment_failed':
-                return self._handle_payment_failed(event['data']['object'])
-            else:
-                logger.info(f"📝 Unhandled webhook event: {event['type']}")
-                return {"success": True, "event": event['type'], "handled": False}
+            # Stripe delivers at-least-once; skip events we've already accepted
+            if self._is_duplicate_event(event['id']):
+                logger.info(f"📝 Duplicate webhook event ignored: {event['id']}")
+                return {"success": True, "event": event['type'], "duplicate": True}
+            
+            # Hand off to the background consumer and acknowledge right away; the journal entry
+            # is what makes the acknowledgement safe if the event can't be handled now
+            self.start_event_consumer()
+            if self.event_queue.full():
+                logger.warning(f"⚠️ Webhook queue full, asking Stripe to retry {event['type']}")
+                return {"success": False, "error": "Webhook queue full", "retry": True}
+            
+            self._journal_event({"id": event['id'], "payload": payload.decode()})
+            self.event_queue.put_nowait(event)
+            self._mark_event_seen(event['id'])
+            return {"success": True, "event": event['type'], "queued": True}
                 
         except ValueError as e:
             logger.error(f"❌ Invalid payload: {e}")
             return {"success": False, "error": "Invalid payload"}
-        except stripe.error.SignatureVerificationError as e:
+        except self.stripe.error.SignatureVerificationError as e:
             logger.error(f"❌ Invalid signature: {e}")
             return {"success": False, "error": "Invalid signature"}
         except Exception as e:
             logger.error(f"❌ Error processing webhook: {e}")
             return {"success": False, "error": str(e)}
     
-    def _handle_checkout_completed(self, session: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle checkout.session.completed event"""
+    def _construct_event(self, payload: bytes, sig_header: str):
+        """Verify the Stripe-Signature header and parse the event (like Webhook.construct_event)"""
+        timestamp = None
+        signatures = []
+        for item in (sig_header or '').split(','):
+            key, _, value = item.strip().partition('=')
+            if key == 't':
+                timestamp = value
+            elif key == 'v1':
+                signatures.append(value)
+        
+        if not timestamp or not signatures:
+            raise self.stripe.error.SignatureVerificationError(
+                "Unable to extract timestamp and signatures from header", sig_header, payload
+            )
+        
+        mac = self.webhook_hmac.copy()
+        mac.update(timestamp.encode() + b'.')
+        mac.update(payload if isinstance(payload, bytes) else payload.encode())
+        expected = mac.hexdigest()
+        
+        if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+            raise self.stripe.error.SignatureVerificationError(
+                "No signatures found matching the expected signature for payload", sig_header, payload
+            )
+        if not timestamp.isdigit() or int(timestamp) < time.time() - WEBHOOK_TOLERANCE:
+            raise self.stripe.error.SignatureVerificationError(
+                "Timestamp outside the tolerance zone", sig_header, payload
+            )
+        
+        return self.stripe.Event.construct_from(json.loads(payload), self.stripe.api_key)
+    
+    def _is_duplicate_event(self, event_id: str) -> bool:
+        """Check whether a webhook event was already accepted within the dedup window"""
+        seen_at = self.seen_events.get(event_id)
+        return seen_at is not None and time.monotonic() - seen_at < WEBHOOK_DEDUP_TTL
+    
+    def _mark_event_seen(self, event_id: str):
+        """Record an accepted webhook event id"""
+        self.seen_events.pop(event_id, None)
+        if len(self.seen_events) >= WEBHOOK_DEDUP_MAX_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            self.seen_events.pop(next(iter(self.seen_events)))
+        self.seen_events[event_id] = time.monotonic()
+    
+    def _journal_event(self, record: Dict[str, Any]):
+        """Append an accepted-event or done record to the webhook journal"""
+        WEBHOOK_JOURNAL_FILE.parent.mkdir(exist_ok=True)
+        with open(WEBHOOK_JOURNAL_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    
+    def _replay_journal(self):
+        """Queue journaled events that were never handled, and rewrite the journal to just those"""
         try:
-            business_site_id = session.get('metadata', {}).get('business_site_id')
-            if not business_site_id:
-                logger.error("❌ No business_site_id in session metadata")
-                return {"success": False, "error": "No business_site_id"}
-            
-            logger.info(f"✅ Payment completed for {business_site_id}")
-            
-            return {
-                "success": True,
-                "event": "checkout.session.completed",
-                "business_site_id": business_site_id,
-                "amount": session.get('amount_total'),
-                "currency": session.get('currency'),
-                "customer_email": session.get('customer_details', {}).get('email')
-            }
-            
+            pending: Dict[str, str] = {}
+            with open(WEBHOOK_JOURNAL_FILE, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        if record.get('done'):
+                            pending.pop(record['id'], None)
+                        else:
+                            pending[record['id']] = record['payload']
+        except FileNotFoundError:
+            return
         except Exception as e:
-            logger.error(f"❌ Error handling checkout completed: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"❌ Error reading webhook journal: {e}")
+            return
+        
+        try:
+            tmp_file = WEBHOOK_JOURNAL_FILE.with_suffix('.jsonl.tmp')
+            with open(tmp_file, 'w') as f:
+                f.write(''.join(json.dumps({"id": event_id, "payload": payload}) + '\n'
+                                for event_id, payload in pending.items()))
+            os.replace(tmp_file, WEBHOOK_JOURNAL_FILE)
+        except OSError as e:
+            logger.error(f"❌ Error compacting webhook journal: {e}")
+        
+        for event_id, payload in pending.items():
+            if self.event_queue.full():
+                break  # Still journaled; picked up on a later start
+            self.event_queue.put_nowait(self.stripe.Event.construct_from(json.loads(payload), self.stripe.api_key))
+            self._mark_event_seen(event_id)
+        if pending:
+            logger.info(f"🔄 Replaying {len(pending)} unhandled webhook events")
+    
+    def start_event_consumer(self):
+        """Start the background webhook consumer if it isn't running (replaying unhandled events first)"""
+        if self.event_consumer is None:
+            self._replay_journal()
+        if self.event_consumer is None or self.event_consumer.done():
+            self.event_consumer = asyncio.get_running_loop().create_task(self._consume_events())
+    
+    async def _consume_events(self):
+        """Drain queued webhook events and dispatch them to their handlers"""
+        while True:
+            event = await self.event_queue.get()
+            try:
+                handled = await self._handle_event(event)
+            except Exception as e:
+                logger.error(f"❌ Error processing webhook event: {e}")
+                handled = False
+            finally:
+                self.event_queue.task_done()
+            
+            if handled:
+                self._journal_event({"id": event['id'], "done": True})
+            else:
+                # Left pending in the journal, so it's retried on the next start
+                self.seen_events.pop(event['id'], None)
+    
+    async def _handle_event(self, event: Dict[str, Any]) -> bool:
+        """Dispatch one event and carry a completed checkout into the Phase 2 workflow"""
+        result = self._dispatch_event(event)
+        if not result.get('success'):
+            logger.error(f"❌ Webhook event {event['type']} failed: {result.get('error')}")
+            return False
+        
+        if result.get('event') == 'checkout.session.completed':
+            # Imported here: the orchestrator loads this module lazily too
+            from app.phase2_orchestrator import get_phase2_orchestrator
+            completion = await get_phase2_orchestrator().handle_payment_completion(
+                result['business_site_id'], event['data']['object']['id']
+            )
+            return bool(completion.get('payment_verified'))
+        return True
+    
+    def _dispatch_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Route a verified webhook event to its handler"""
+        if event['type'] == 'checkout.session.completed':
+            return self._handle_checkout_completed(event['data']['object'])
+        elif event['type'] == 'payment_intent.succeeded':
+            return self._handle_payment_succeeded(event['data']['object'])
+        elif event['type'] == 'payment_intent.payment_failed':
+            return self._handle_payment_failed(event['data']['object'])
+        else:
+            logger.info(f"📝 Unhandled webhook event: {event['type']}")
+            return {"success": True, "event": event['type'], "handled": False}
+    
+    def _handle_checkout_completed(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle checkout.session.completed event"""
+        # Stripe sends explicit nulls for empty objects, so fall back with `or {}`
+        # Shared payment links carry the business in client_reference_id instead of metadata
+        business_site_id = (session.get('metadata') or {}).get('business_site_id') or session.get('client_reference_id')
+        if not business_site_id:
+            logger.error("❌ No business_site_id in session metadata")
+            return {"success": False, "error": "No business_site_id"}
+        
+        # A PaymentIntent may only ever settle one business
+        if payment_intent_id := session.get('payment_intent'):
+            bound_site_id = self.payment_bindings.setdefault(payment_intent_id, business_site_id)
+            if bound_site_id != business_site_id:
+                logger.error(f"❌ Payment {payment_intent_id} already applied to {bound_site_id}")
+                return {"success": False, "error": "Payment already applied to another business"}
+        
+        logger.info(f"✅ Payment completed for {business_site_id}")
+        
+        # Write the new status through so verify_payment doesn't re-fetch it
+        if session_id := session.get('id'):
+            self._cache_session(session_id, session)
+        
+        return {
+            "success": True,
+            "event": "checkout.session.completed",
+            "business_site_id": business_site_id,
+            "amount": session.get('amount_total'),
+            "currency": session.get('currency'),
+            "customer_email": (session.get('customer_details') or {}).get('email')
+        }
     
     def _handle_payment_succeeded(self, payment_intent: Dict[str, Any]) -> Dict[str, Any]:
         """Handle payment_intent.succeeded event"""
-        try:
-            logger.info(f"✅ Payment succeeded: {payment_intent.get('id')}")
-            
-            return {
-                "success": True,
-                "event": "payment_intent.succeeded",
-                "payment_intent_id": payment_intent.get('id'),
-                "amount": payment_intent.get('amount'),
-                "currency": payment_intent.get('currency')
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error handling payment succeeded: {e}")
-            return {"success": False, "error": str(e)}
+        logger.info(f"✅ Payment succeeded: {payment_intent.get('id')}")
+        
+        return {
+            "success": True,
+            "event": "payment_intent.succeeded",
+            "payment_intent_id": payment_intent.get('id'),
+            "amount": payment_intent.get('amount'),
+            "currency": payment_intent.get('currency')
+        }
     
     def _handle_payment_failed(self, payment_intent: Dict[str, Any]) -> Dict[str, Any]:
         """Handle payment_intent.payment_failed event"""
-        try:
-            logger.warning(f"⚠️ Payment failed: {payment_intent.get('id')}")
-            
-            return {
-                "success": True,
-                "event": "payment_intent.payment_failed",
-                "payment_intent_id": payment_intent.get('id'),
-                "error": payment_intent.get('last_payment_error', {}).get('message')
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error handling payment failed: {e}")
-            return {"success": False, "error": str(e)}
+        logger.warning(f"⚠️ Payment failed: {payment_intent.get('id')}")
+        
+        return {
+            "success": True,
+            "event": "payment_intent.payment_failed",
+            "payment_intent_id": payment_intent.get('id'),
+            "error": (payment_intent.get('last_payment_error') or {}).get('message')
+        }
     
-    def get_payment_status(self, session_id: str) -> PaymentStatus:
+    async def get_payment_status(self, session_id: str) -> PaymentStatus:
         """Get payment status for a session"""
         try:
             if not config.STRIPE_SECRET_KEY:
                 return PaymentStatus.FAILED
             
-            session = self.stripe.checkout.Session.retrieve(session_id)
+            session = await self._retrieve_session(session_id)
             
             if session.payment_status == 'paid':
                 return PaymentStatus.COMPLETED
@@ -206,7 +594,7 @@ class PaymentHandler:
             logger.error(f"❌ Error getting payment status: {e}")
             return PaymentStatus.FAILED
     
-    def create_refund(self, payment_intent_id: str, amount: int = None) -> Dict[str, Any]:
+    async def create_refund(self, payment_intent_id: str, amount: int = None) -> Dict[str, Any]:
         """Create a refund for a payment"""
         try:
             if not config.STRIPE_SECRET_KEY:
@@ -216,7 +604,8 @@ class PaymentHandler:
             if amount:
                 refund_data['amount'] = amount
             
-            refund = self.stripe.Refund.create(**refund_data)
+            idempotency_key = self._idempotency_key("refund", payment_intent_id, amount or "full")
+            refund = await self._call(self.stripe.Refund.create, idempotency_key=idempotency_key, **refund_data)
             
             logger.info(f"✅ Refund created: {refund.id}")
             return {
@@ -226,7 +615,7 @@ class PaymentHandler:
                 "amount": refund.amount
             }
             
-        except stripe.error.StripeError as e:
+        except self.stripe.error.StripeError as e:
             logger.error(f"❌ Stripe error creating refund: {e}")
             return {"success": False, "error": str(e)}
         except Exception as e:
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, HttpUrl, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, HttpUrl, Field, EmailStr, model_validator
+from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from enum import Enum
 
@@ -26,6 +27,15 @@ class InteractionStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Statuses where we're waiting on the client or a background step
+PENDING_STATUSES = frozenset({
+    InteractionStatus.ENGAGEMENT_SENT,
+    InteractionStatus.PAYMENT_PENDING,
+    InteractionStatus.CREDENTIALS_PENDING,
+    InteractionStatus.IMPLEMENTATION_IN_PROGRESS,
+    InteractionStatus.QA_PENDING
+})
+
 class PaymentStatus(str, Enum):
     """Payment processing status"""
     PENDING = "pending"
@@ -42,6 +52,22 @@ class QAResult(str, Enum):
     REJECTED = "rejected"
     NEEDS_REVISION = "needs_revision"
 
+# Per-step date fields from before status_timestamps, mapped to the status they recorded
+_LEGACY_DATE_FIELDS = {
+    "initial_outreach_date": InteractionStatus.INITIAL_OUTREACH,
+    "engagement_sent_date": InteractionStatus.ENGAGEMENT_SENT,
+    "client_response_date": InteractionStatus.CLIENT_RESPONDED,
+    "agreement_date": InteractionStatus.AGREED_TO_HELP,
+    "payment_completed_date": InteractionStatus.PAYMENT_COMPLETED,
+    "credentials_requested_date": InteractionStatus.CREDENTIALS_REQUESTED,
+    "credentials_collected_date": InteractionStatus.CREDENTIALS_COLLECTED,
+    "seo_fixes_started_date": InteractionStatus.SEO_FIXES_STARTED,
+    "seo_fixes_completed_date": InteractionStatus.SEO_FIXES_COMPLETED,
+    "qa_requested_date": InteractionStatus.QA_REQUESTED,
+    "owner_notified_date": InteractionStatus.OWNER_NOTIFIED,
+    "completion_date": InteractionStatus.COMPLETED,
+}
+
 class ClientInteraction(BaseModel):
     """Tracks the full client interaction flow"""
     business_site_id: str
@@ -58,47 +84,31 @@ class ClientInteraction(BaseModel):
     
     # Interaction flow
     status: InteractionStatus = InteractionStatus.INITIAL_OUTREACH
-    initial_outreach_date: Optional[datetime] = None
-    engagement_sent_date: Optional[datetime] = None
-    client_response_date: Optional[datetime] = None
+    status_timestamps: Dict[InteractionStatus, datetime] = Field(default_factory=dict)
     client_response_text: Optional[str] = None
-    agreement_date: Optional[datetime] = None
     
     # Payment details
     payment_link: Optional[str] = None
     payment_status: PaymentStatus = PaymentStatus.PENDING
     payment_amount: int = 10000  # $100 in cents
-    payment_completed_date: Optional[datetime] = None
     stripe_payment_id: Optional[str] = None
     stripe_session_id: Optional[str] = None
+    stripe_client_reference_id: Optional[str] = None  # Tagged onto the sent link; its checkout sessions carry it back
     
-    # Credentials collection
-    credentials_requested_date: Optional[datetime] = None
-    website_url: Optional[str] = None
-    cms_login_url: Optional[str] = None
-    username: Optional[str] = None
-    password_encrypted: Optional[str] = None
-    credentials_collected_date: Optional[datetime] = None
-    credentials_notes: Optional[str] = None
+    # Credentials live only in the encrypted store (CredentialsManager), keyed by business_site_id
     
     # SEO Implementation
-    seo_fixes_started_date: Optional[datetime] = None
-    seo_fixes_completed_date: Optional[datetime] = None
     changes_made: List[str] = Field(default_factory=list)
     implementation_notes: Optional[str] = None
     implementation_success: Optional[bool] = None
     
     # QA Process
-    qa_requested_date: Optional[datetime] = None
     qa_reviewer: Optional[str] = None
     qa_result: QAResult = QAResult.PENDING
     qa_notes: Optional[str] = None
-    qa_completed_date: Optional[datetime] = None
     qa_review_url: Optional[str] = None
     
     # Final notification
-    owner_notified_date: Optional[datetime] = None
-    completion_date: Optional[datetime] = None
     final_message_sent: Optional[str] = None
     
     # Communication history
@@ -109,11 +119,32 @@ class ClientInteraction(BaseModel):
     retry_count: int = 0
     last_retry_date: Optional[datetime] = None
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            HttpUrl: lambda v: str(v)
-        }
+    @model_validator(mode='before')
+    @classmethod
+    def _migrate_legacy_dates(cls, data: Any) -> Any:
+        """Fold legacy *_date fields from older records into status_timestamps"""
+        if isinstance(data, dict) and not data.keys().isdisjoint(_LEGACY_DATE_FIELDS.keys() | {"qa_completed_date"}):
+            data = dict(data)
+            timestamps = dict(data.get("status_timestamps") or {})
+            for field, status in _LEGACY_DATE_FIELDS.items():
+                value = data.pop(field, None)
+                if value is not None:
+                    timestamps.setdefault(status, value)
+            qa_completed = data.pop("qa_completed_date", None)
+            if qa_completed is not None:
+                qa_status = InteractionStatus.QA_APPROVED if data.get("qa_result") == QAResult.APPROVED else InteractionStatus.QA_REJECTED
+                timestamps.setdefault(qa_status, qa_completed)
+            data["status_timestamps"] = timestamps
+        return data
+    
+    def mark(self, status: InteractionStatus):
+        """Move to a new status and record when it happened"""
+        self.status = status
+        self.status_timestamps[status] = datetime.now()
+    
+    def timestamp(self, status: InteractionStatus) -> Optional[datetime]:
+        """When the interaction reached a status, if it has"""
+        return self.status_timestamps.get(status)
 
 class PaymentRequest(BaseModel):
     """Payment request for Stripe"""
@@ -125,13 +156,6 @@ class PaymentRequest(BaseModel):
     cancel_url: Optional[HttpUrl] = None
     metadata: Optional[Dict[str, str]] = None
 
-class PaymentResponse(BaseModel):
-    """Payment response from Stripe"""
-    success: bool
-    payment_link: Optional[str] = None
-    session_id: Optional[str] = None
-    error_message: Optional[str] = None
-
 class CredentialsRequest(BaseModel):
     """Credentials collection request"""
     business_site_id: str
@@ -141,52 +165,76 @@ class CredentialsRequest(BaseModel):
     password: str
     additional_notes: Optional[str] = None
 
-class CredentialsResponse(BaseModel):
+class QARequest(BaseModel):
+    """QA review request"""
+    business_site_id: str
+    reviewer_email: Optional[str] = None
+    review_url: Optional[HttpUrl] = None
+    qa_notes: Optional[str] = None
+
+# Internal-only DTOs: built once and passed along, so they're frozen slotted dataclasses
+# rather than validated models
+
+class _DTO:
+    """Mixin giving dataclass DTOs a dict form for serialization"""
+    __slots__ = ()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+@dataclass(slots=True, frozen=True)
+class PaymentResponse(_DTO):
+    """Payment response from Stripe"""
+    success: bool
+    payment_link: Optional[str] = None
+    session_id: Optional[str] = None
+    error_message: Optional[str] = None
+
+@dataclass(slots=True, frozen=True)
+class CredentialsResponse(_DTO):
     """Credentials collection response"""
     success: bool
     credentials_stored: bool
     error_message: Optional[str] = None
 
-class SEOImplementation(BaseModel):
+@dataclass(slots=True, frozen=True)
+class SEOImplementation(_DTO):
     """SEO implementation request"""
     business_site_id: str
-    changes_to_implement: List[str]
+    changes_to_implement: Tuple[str, ...]
     implementation_notes: Optional[str] = None
 
-class SEOImplementationResponse(BaseModel):
+@dataclass(slots=True, frozen=True)
+class SEOImplementationResponse(_DTO):
     """SEO implementation response"""
     success: bool
-    changes_implemented: List[str]
+    changes_implemented: Tuple[str, ...]
     implementation_notes: Optional[str] = None
     error_message: Optional[str] = None
 
-class QARequest(BaseModel):
-    """QA review request"""
-    business_site_id: str
-    reviewer_email: Optional[str] = None
-    review_url: Optional[HttpUrl] = None
-    qa_notes: Optional[str] = None
-
-class QAResponse(BaseModel):
+@dataclass(slots=True, frozen=True)
+class QAResponse(_DTO):
     """QA review response"""
     business_site_id: str
     qa_result: QAResult
     reviewer: str
     qa_notes: Optional[str] = None
-    review_date: datetime = Field(default_factory=datetime.now)
+    review_date: datetime = field(default_factory=datetime.now)
 
-class OwnerNotification(BaseModel):
+@dataclass(slots=True, frozen=True)
+class OwnerNotification(_DTO):
     """Owner notification request"""
     business_site_id: str
     notification_type: str = "completion"  # completion, qa_approved, etc.
     message: Optional[str] = None
     include_review_link: bool = True
 
-class EngagementMessage(BaseModel):
+@dataclass(slots=True, frozen=True)
+class EngagementMessage(_DTO):
     """Engagement message for client interaction"""
     business_site_id: str
+    body: str
     message_type: str = "engagement"  # engagement, payment, credentials, completion
     subject: Optional[str] = None
-    body: str
     include_payment_link: bool = False
     include_credentials_form: bool = False
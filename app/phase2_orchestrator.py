@@ -1,39 +1,103 @@
+import asyncio
+import functools
 import logging
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime
 from pathlib import Path
 
 from app.config import config
 from app.phase2_models import (
-    ClientInteraction, InteractionStatus, PaymentStatus, QAResult,
+    ClientInteraction, InteractionStatus, PaymentStatus, QAResult, PENDING_STATUSES,
     QARequest, QAResponse, SEOImplementation, OwnerNotification
 )
-from app.communication_manager import communication_manager
-from app.payment_handler import payment_handler
-from app.credentials_manager import credentials_manager
-from app.seo_implementer import seo_implementer
-from app.qa_manager import qa_manager
 from app.utils import data_manager
 
 logger = logging.getLogger(__name__)
 
+# Payment verifications the pending sweep runs at once
+SWEEP_VERIFY_CONCURRENCY = 5
+
+# Enum .value is a descriptor lookup; precompute for the per-interaction loops
+_STATUS_VALUE = {status: status.value for status in InteractionStatus}
+_PAYMENT_VALUE = {status: status.value for status in PaymentStatus}
+
+def _interaction_summary(interaction: ClientInteraction) -> Dict[str, Any]:
+    """Flat dict view of an interaction, shared by the pending list and workflow status"""
+    started = interaction.timestamp(InteractionStatus.INITIAL_OUTREACH)
+    return {
+        'business_site_id': interaction.business_site_id,
+        'domain': interaction.domain,
+        'business_name': interaction.business_name,
+        'status': _STATUS_VALUE[interaction.status],
+        'payment_status': _PAYMENT_VALUE[interaction.payment_status],
+        'last_updated': started.isoformat() if started else None
+    }
+
 class Phase2Orchestrator:
     """Orchestrates the complete Phase 2 client interaction and fulfillment workflow"""
     
     def __init__(self):
-        self.communication_manager = communication_manager
-        self.payment_handler = payment_handler
-        self.credentials_manager = credentials_manager
-        self.seo_implementer = seo_implementer
-        self.qa_manager = qa_manager
+        # Workflow runs in progress, keyed by domain, so a concurrent duplicate joins the first
+        self._inflight_workflows: Dict[str, asyncio.Task] = {}
+    
+    # Managers are imported on first use so a caller that only needs one subsystem
+    # doesn't load (and instantiate) every Phase 2 singleton
+    @functools.cached_property
+    def communication_manager(self):
+        from app.communication_manager import communication_manager
+        return communication_manager
+    
+    @functools.cached_property
+    def payment_handler(self):
+        from app.payment_handler import payment_handler
+        return payment_handler
+    
+    @functools.cached_property
+    def credentials_manager(self):
+        from app.credentials_manager import credentials_manager
+        return credentials_manager
+    
+    @functools.cached_property
+    def seo_implementer(self):
+        from app.seo_implementer import seo_implementer
+        return seo_implementer
+    
+    @functools.cached_property
+    def qa_manager(self):
+        from app.qa_manager import qa_manager
+        return qa_manager
+    
+    @staticmethod
+    def _step_result(business_site_id: str, done_flag: str) -> Dict[str, Any]:
+        """Common result shape for a single workflow step; done_flag starts False"""
+        return {'business_site_id': business_site_id, done_flag: False, 'next_step': None, 'errors': []}
     
-    def run_phase2_workflow(self, business_site_id: str, domain: str, 
+    async def run_phase2_workflow(self, business_site_id: str, domain: str, 
                           business_name: str, seo_score: int, 
                           seo_issues: List[str], seo_recommendations: List[str]) -> Dict[str, Any]:
         """
         Run the complete Phase 2 workflow for a single client
+        A call for a domain that already has a run in progress shares that run's result;
+        keyed by domain because callers mint a fresh business_site_id per call
         """
+        task = self._inflight_workflows.get(domain)
+        if task is not None:
+            logger.info(f"⏭️  Phase 2 workflow already running for {domain}, joining it")
+        else:
+            task = asyncio.create_task(self._run_phase2_workflow(
+                business_site_id, domain, business_name, seo_score, seo_issues, seo_recommendations
+            ))
+            self._inflight_workflows[domain] = task
+            task.add_done_callback(lambda _: self._inflight_workflows.pop(domain, None))
+        
+        # Shield so one caller being cancelled doesn't cancel the run for the others
+        return await asyncio.shield(task)
+    
+    async def _run_phase2_workflow(self, business_site_id: str, domain: str,
+                                   business_name: str, seo_score: int,
+                                   seo_issues: List[str], seo_recommendations: List[str]) -> Dict[str, Any]:
+        """Phase 2 workflow body; always called through run_phase2_workflow"""
         logger.info(f"🚀 Starting Phase 2 workflow for {domain}")
         
         workflow_result = {
@@ -47,7 +111,8 @@ class Phase2Orchestrator:
         
         try:
             # Step 1: Start client interaction
-            interaction = self.communication_manager.start_interaction(
+            interaction = await asyncio.to_thread(
+                self.communication_manager.start_interaction,
                 business_site_id=business_site_id,
                 domain=domain,
                 business_name=business_name,
@@ -58,7 +123,7 @@ class Phase2Orchestrator:
             workflow_result['steps_completed'].append('interaction_started')
             
             # Step 2: Send engagement message
-            if self.communication_manager.send_engagement_message(business_site_id, seo_issues):
+            if await asyncio.to_thread(self.communication_manager.send_engagement_message, business_site_id, seo_issues):
                 workflow_result['steps_completed'].append('engagement_sent')
                 logger.info(f"✅ Engagement message sent to {domain}")
             else:
@@ -76,36 +141,33 @@ class Phase2Orchestrator:
             workflow_result['end_time'] = datetime.now().isoformat()
             return workflow_result
     
-    def process_client_response(self, business_site_id: str, response_text: str) -> Dict[str, Any]:
+    async def process_client_response(self, business_site_id: str, response_text: str) -> Dict[str, Any]:
         """
         Process client response and continue workflow
         """
         logger.info(f"📝 Processing client response for {business_site_id}")
         
-        result = {
-            'business_site_id': business_site_id,
-            'response_processed': False,
-            'next_step': None,
-            'errors': []
-        }
+        result = self._step_result(business_site_id, 'response_processed')
         
         try:
             # Process the response
-            response_result = self.communication_manager.process_client_response(business_site_id, response_text)
+            response_result = await asyncio.to_thread(
+                self.communication_manager.process_client_response, business_site_id, response_text
+            )
             
             if response_result['success']:
                 result['response_processed'] = True
                 
                 if response_result['agreed']:
                     # Client agreed to help - send payment link
-                    payment_link = self.payment_handler.create_payment_link(
+                    payment_link = await self.payment_handler.create_payment_link(
                         business_site_id=business_site_id,
                         amount=10000,  # $100
                         description=f"SEO improvements for {business_site_id}"
                     )
                     
                     if payment_link:
-                        self.communication_manager.send_payment_link(business_site_id, payment_link)
+                        await asyncio.to_thread(self.communication_manager.send_payment_link, business_site_id, payment_link)
                         result['next_step'] = 'payment_link_sent'
                         logger.info(f"✅ Payment link sent to {business_site_id}")
                     else:
@@ -118,27 +180,27 @@ class Phase2Orchestrator:
             
             return result
             
+        except (KeyError, ValueError) as e:
+            # Malformed manager/handler result: expected failure mode, no traceback needed
+            logger.warning(f"⚠️ Could not process client response for {business_site_id}: {e!r}")
+            result['errors'].append(str(e))
+            return result
         except Exception as e:
-            logger.error(f"❌ Error processing client response: {e}")
+            logger.exception(f"❌ Error processing client response: {e}")
             result['errors'].append(str(e))
             return result
     
-    def handle_payment_completion(self, business_site_id: str, session_id: str) -> Dict[str, Any]:
+    async def handle_payment_completion(self, business_site_id: str, session_id: str) -> Dict[str, Any]:
         """
         Handle payment completion and move to credentials collection
         """
         logger.info(f"💳 Handling payment completion for {business_site_id}")
         
-        result = {
-            'business_site_id': business_site_id,
-            'payment_verified': False,
-            'next_step': None,
-            'errors': []
-        }
+        result = self._step_result(business_site_id, 'payment_verified')
         
         try:
             # Verify payment
-            payment_verification = self.payment_handler.verify_payment(session_id)
+            payment_verification = await self.payment_handler.verify_payment(session_id)
             
             if payment_verification['success']:
                 result['payment_verified'] = True
@@ -147,12 +209,11 @@ class Phase2Orchestrator:
                 interaction = self.communication_manager.get_interaction(business_site_id)
                 if interaction:
                     interaction.payment_status = PaymentStatus.COMPLETED
-                    interaction.payment_completed_date = datetime.now()
                     interaction.stripe_session_id = session_id
-                    interaction.status = InteractionStatus.PAYMENT_COMPLETED
+                    self.communication_manager.transition(interaction, InteractionStatus.PAYMENT_COMPLETED)
                 
                 # Request credentials
-                if self.communication_manager.request_credentials(business_site_id):
+                if await asyncio.to_thread(self.communication_manager.request_credentials, business_site_id):
                     result['next_step'] = 'credentials_requested'
                     logger.info(f"✅ Credentials requested for {business_site_id}")
                 else:
@@ -162,12 +223,17 @@ class Phase2Orchestrator:
             
             return result
             
+        except (KeyError, ValueError) as e:
+            # Malformed verification result: expected failure mode, no traceback needed
+            logger.warning(f"⚠️ Could not verify payment for {business_site_id}: {e!r}")
+            result['errors'].append(str(e))
+            return result
         except Exception as e:
-            logger.error(f"❌ Error handling payment completion: {e}")
+            logger.exception(f"❌ Error handling payment completion: {e}")
             result['errors'].append(str(e))
             return result
     
-    def collect_credentials(self, business_site_id: str, website_url: str, 
+    async def collect_credentials(self, business_site_id: str, website_url: str, 
                           username: str, password: str, cms_login_url: str = None,
                           notes: str = None) -> Dict[str, Any]:
         """
@@ -175,16 +241,12 @@ class Phase2Orchestrator:
         """
         logger.info(f"🔐 Collecting credentials for {business_site_id}")
         
-        result = {
-            'business_site_id': business_site_id,
-            'credentials_stored': False,
-            'next_step': None,
-            'errors': []
-        }
+        result = self._step_result(business_site_id, 'credentials_stored')
         
         try:
             # Store credentials
-            if self.credentials_manager.store_credentials(
+            if await asyncio.to_thread(
+                self.credentials_manager.store_credentials,
                 business_site_id=business_site_id,
                 website_url=website_url,
                 username=username,
@@ -195,9 +257,7 @@ class Phase2Orchestrator:
                 result['credentials_stored'] = True
                 
                 # Update interaction
-                if self.communication_manager.collect_credentials(
-                    business_site_id, website_url, username, password, cms_login_url, notes
-                ):
+                if await asyncio.to_thread(self.communication_manager.collect_credentials, business_site_id, website_url):
                     result['next_step'] = 'seo_implementation_ready'
                     logger.info(f"✅ Credentials collected for {business_site_id}")
                 else:
@@ -212,24 +272,19 @@ class Phase2Orchestrator:
             result['errors'].append(str(e))
             return result
     
-    def start_seo_implementation(self, business_site_id: str, 
+    async def start_seo_implementation(self, business_site_id: str, 
                                changes_to_implement: List[str]) -> Dict[str, Any]:
         """
         Start SEO implementation process
         """
         logger.info(f"🔧 Starting SEO implementation for {business_site_id}")
         
-        result = {
-            'business_site_id': business_site_id,
-            'implementation_started': False,
-            'next_step': None,
-            'errors': []
-        }
+        result = self._step_result(business_site_id, 'implementation_started')
         
         try:
             # Start implementation
-            implementation_result = self.seo_implementer.start_implementation(
-                business_site_id, changes_to_implement
+            implementation_result = await asyncio.to_thread(
+                self.seo_implementer.start_implementation, business_site_id, changes_to_implement
             )
             
             if implementation_result['success']:
@@ -239,15 +294,15 @@ class Phase2Orchestrator:
                 # Update interaction
                 interaction = self.communication_manager.get_interaction(business_site_id)
                 if interaction:
-                    interaction.status = InteractionStatus.SEO_FIXES_COMPLETED
-                    interaction.seo_fixes_completed_date = datetime.now()
+                    self.communication_manager.transition(interaction, InteractionStatus.SEO_FIXES_COMPLETED)
                     interaction.changes_made = implementation_result['changes_implemented']
                     interaction.implementation_success = True
                 
                 # Request QA review
-                qa_result = self.qa_manager.request_qa_review(
+                qa_result = await asyncio.to_thread(
+                    self.qa_manager.request_qa_review,
                     business_site_id=business_site_id,
-                    website_url=interaction.website_url if interaction else "",
+                    website_url=(self.seo_implementer.get_implementation_status(business_site_id) or {}).get('website_url') or "",
                     changes_made=implementation_result['changes_implemented']
                 )
                 
@@ -266,38 +321,38 @@ class Phase2Orchestrator:
             result['errors'].append(str(e))
             return result
     
-    def submit_qa_response(self, business_site_id: str, reviewer: str,
+    async def submit_qa_response(self, business_site_id: str, reviewer: str,
                           qa_result: str, notes: str = None) -> Dict[str, Any]:
         """
         Submit QA review response
         """
         logger.info(f"📝 Submitting QA response for {business_site_id}")
         
-        result = {
-            'business_site_id': business_site_id,
-            'qa_response_submitted': False,
-            'next_step': None,
-            'errors': []
-        }
+        result = self._step_result(business_site_id, 'qa_response_submitted')
         
         try:
             # Submit QA response
-            qa_response = self.qa_manager.submit_qa_response(
-                business_site_id, reviewer, qa_result, notes
+            qa_response = await asyncio.to_thread(
+                self.qa_manager.submit_qa_response, business_site_id, reviewer, qa_result, notes
             )
             
-            if qa_response['success']:
+            if qa_response.get('duplicate'):
+                # Already processed (e.g. a retried request); don't notify the owner again
+                result['qa_response_submitted'] = True
+                result['next_step'] = 'already_submitted'
+            elif qa_response['success']:
                 result['qa_response_submitted'] = True
                 
                 # Update interaction
                 interaction = self.communication_manager.get_interaction(business_site_id)
                 if interaction:
                     if qa_result.lower() == 'approved':
-                        interaction.status = InteractionStatus.QA_APPROVED
+                        self.communication_manager.transition(interaction, InteractionStatus.QA_APPROVED)
                         interaction.qa_result = QAResult.APPROVED
                         
                         # Notify owner of completion
-                        if self.communication_manager.notify_owner_completion(
+                        if await asyncio.to_thread(
+                            self.communication_manager.notify_owner_completion,
                             business_site_id, 
                             interaction.changes_made or [],
                             qa_approved=True
@@ -307,7 +362,7 @@ class Phase2Orchestrator:
                         else:
                             result['errors'].append("Failed to notify owner")
                     else:
-                        interaction.status = InteractionStatus.QA_REJECTED
+                        self.communication_manager.transition(interaction, InteractionStatus.QA_REJECTED)
                         interaction.qa_result = QAResult.REJECTED
                         result['next_step'] = 'revision_needed'
                         logger.info(f"⚠️ QA rejected for {business_site_id}")
@@ -321,7 +376,7 @@ class Phase2Orchestrator:
             result['errors'].append(str(e))
             return result
     
-    def get_workflow_status(self, business_site_id: str) -> Dict[str, Any]:
+    async def get_workflow_status(self, business_site_id: str) -> Dict[str, Any]:
         """
         Get current workflow status for a business
         """
@@ -334,22 +389,17 @@ class Phase2Orchestrator:
                     'error': 'No interaction found'
                 }
             
-            # Get additional status information
+            # Get additional status information (all in-memory lookups)
             qa_status = self.qa_manager.get_qa_status(business_site_id)
             implementation_status = self.seo_implementer.get_implementation_status(business_site_id)
             credentials_exist = self.credentials_manager.validate_credentials(business_site_id)
             
-            return {
-                'business_site_id': business_site_id,
-                'domain': interaction.domain,
-                'business_name': interaction.business_name,
-                'current_status': interaction.status.value,
-                'payment_status': interaction.payment_status.value,
-                'qa_status': qa_status.get('qa_result') if qa_status else None,
-                'implementation_status': implementation_status.get('status') if implementation_status else None,
-                'credentials_collected': credentials_exist,
-                'last_updated': interaction.initial_outreach_date.isoformat() if interaction.initial_outreach_date else None
-            }
+            status = _interaction_summary(interaction)
+            status['current_status'] = status.pop('status')
+            status['qa_status'] = qa_status.get('qa_result') if qa_status else None
+            status['implementation_status'] = implementation_status.get('status') if implementation_status else None
+            status['credentials_collected'] = credentials_exist
+            return status
             
         except Exception as e:
             logger.error(f"❌ Error getting workflow status: {e}")
@@ -359,33 +409,84 @@ class Phase2Orchestrator:
                 'error': str(e)
             }
     
+    async def run_pending_sweep(self, batch_size: int = 100) -> Dict[str, Any]:
+        """
+        Advance stalled interactions in one pass, batching each kind of follow-up action
+        """
+        result = {
+            'payment_links_sent': 0,
+            'payments_verified': 0,
+            'credentials_requested': 0,
+            'errors': []
+        }
+        
+        try:
+            # Agreed but no payment link yet (e.g. link creation failed earlier)
+            awaiting_link = [
+                i.business_site_id
+                for i in self.communication_manager.get_interactions_by_status(InteractionStatus.AGREED_TO_HELP)[:batch_size]
+            ]
+            if awaiting_link:
+                payment_links = await self.payment_handler.create_payment_links_batch(awaiting_link)
+                for business_site_id, payment_link in payment_links.items():
+                    if payment_link and await asyncio.to_thread(
+                        self.communication_manager.send_payment_link, business_site_id, payment_link
+                    ):
+                        result['payment_links_sent'] += 1
+            
+            # Payment links out: find their completed checkout sessions with one listing, then verify those
+            awaiting_payment = [
+                i for i in self.communication_manager.get_interactions_by_status(
+                    (InteractionStatus.PAYMENT_LINK_SENT, InteractionStatus.PAYMENT_PENDING)
+                )
+                if i.stripe_client_reference_id
+            ][:batch_size]
+            if awaiting_payment:
+                sent_at = [t for t in (i.timestamp(InteractionStatus.PAYMENT_LINK_SENT) for i in awaiting_payment) if t]
+                sessions = await self.payment_handler.find_completed_sessions(
+                    [i.stripe_client_reference_id for i in awaiting_payment],
+                    since=min(sent_at) if len(sent_at) == len(awaiting_payment) else None
+                )
+                semaphore = asyncio.Semaphore(SWEEP_VERIFY_CONCURRENCY)
+                
+                async def verify_one(interaction: ClientInteraction) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await self.handle_payment_completion(
+                            interaction.business_site_id, sessions[interaction.stripe_client_reference_id]
+                        )
+                
+                completions = await asyncio.gather(*(
+                    verify_one(i) for i in awaiting_payment if i.stripe_client_reference_id in sessions
+                ))
+                result['payments_verified'] = sum(1 for c in completions if c['payment_verified'])
+            
+            # Paid but credentials never requested
+            for interaction in self.communication_manager.get_interactions_by_status(InteractionStatus.PAYMENT_COMPLETED)[:batch_size]:
+                if await asyncio.to_thread(self.communication_manager.request_credentials, interaction.business_site_id):
+                    result['credentials_requested'] += 1
+            
+            logger.info(f"🔄 Pending sweep: {result}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Error in pending sweep: {e}")
+            result['errors'].append(str(e))
+            return result
+    
+    def iter_pending_interactions(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield pending interactions one at a time, for callers that only iterate
+        """
+        return map(_interaction_summary, self.communication_manager.iter_interactions_by_status(PENDING_STATUSES))
+    
     def get_pending_interactions(self) -> List[Dict[str, Any]]:
         """
         Get list of pending interactions that need monitoring/processing
         """
         try:
-            interactions = self.communication_manager.get_all_interactions()
-            pending_interactions = []
-            
-            for interaction in interactions:
-                # Check if interaction needs monitoring based on status
-                if interaction.status in [
-                    InteractionStatus.ENGAGEMENT_SENT,
-                    InteractionStatus.PAYMENT_PENDING,
-                    InteractionStatus.CREDENTIALS_PENDING,
-                    InteractionStatus.IMPLEMENTATION_IN_PROGRESS,
-                    InteractionStatus.QA_PENDING
-                ]:
-                    pending_interactions.append({
-                        'business_site_id': interaction.business_site_id,
-                        'domain': interaction.domain,
-                        'business_name': interaction.business_name,
-                        'status': interaction.status.value,
-                        'payment_status': interaction.payment_status.value,
-                        'last_updated': interaction.initial_outreach_date.isoformat() if interaction.initial_outreach_date else None
-                    })
-            
-            logger.debug(f"📧 Found {len(pending_interactions)} pending interactions")
+            pending_interactions = list(self.iter_pending_interactions())
+            
+            logger.debug("📧 Found %d pending interactions", len(pending_interactions))
             return pending_interactions
             
         except Exception as e:
@@ -397,20 +498,27 @@ class Phase2Orchestrator:
         Get summary of all Phase 2 workflows
         """
         try:
-            interactions = self.communication_manager.get_all_interactions()
-            
-            total_interactions = len(interactions)
-            interactions_by_status = {}
+            # Counts are maintained incrementally by the communication manager
+            total_interactions = self.communication_manager.get_interaction_count()
+            if not total_interactions:
+                # Nothing has entered Phase 2 yet; skip the per-manager summaries (credentials reads disk)
+                return {
+                    'total_interactions': 0,
+                    'interactions_by_status': dict.fromkeys(_STATUS_VALUE.values(), 0),
+                    'payment_summary': {'total_payments': 0, 'pending_payments': 0},
+                    'qa_summary': {},
+                    'implementation_summary': {},
+                    'credentials_summary': {}
+                }
             
-            for status in InteractionStatus:
-                interactions_by_status[status.value] = len([
-                    i for i in interactions if i.status == status
-                ])
+            status_counts = self.communication_manager.get_status_counts()
+            payment_counts = self.communication_manager.get_payment_counts()
+            interactions_by_status = {value: status_counts[status] for status, value in _STATUS_VALUE.items()}
             
             # Get additional summaries
             payment_summary = {
-                'total_payments': len([i for i in interactions if i.payment_status == PaymentStatus.COMPLETED]),
-                'pending_payments': len([i for i in interactions if i.payment_status == PaymentStatus.PENDING])
+                'total_payments': payment_counts[PaymentStatus.COMPLETED],
+                'pending_payments': payment_counts[PaymentStatus.PENDING]
             }
             
             qa_summary = self.qa_manager.get_qa_summary()
@@ -434,5 +542,7 @@ class Phase2Orchestrator:
                 'error': str(e)
             }
 
-# Global instance
-phase2_orchestrator = Phase2Orchestrator()
+@functools.cache
+def get_phase2_orchestrator() -> Phase2Orchestrator:
+    """Shared orchestrator instance, created on first use"""
+    return Phase2Orchestrator()
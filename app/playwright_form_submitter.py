@@ -1,18 +1,135 @@
 import asyncio
+import contextlib
 import logging
 import time
-from typing import Dict, List, Optional, Any
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Set, Tuple
 from urllib.parse import urljoin, urlparse
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from bs4 import BeautifulSoup
 import re
 
 from app.config import config
 from app.models import ContactForm, OutreachMessage, BusinessSite
 from app.utils import extract_domain, clean_url, is_valid_url, data_manager
 from app.captcha_solver import CaptchaSolver
+from app.form_submitter import FormSubmitter
 
 logger = logging.getLogger(__name__)
 
+# Contact form field rules, tried in order per field type: (tag, attribute, lowercase needle).
+# 'type' is an exact match, other attributes a substring match, and a None attribute matches any element of the tag.
+_FIELD_RULES = {
+    'name': (
+        ('input', 'name', 'name'),
+        ('input', 'placeholder', 'name'),
+        ('input', 'id', 'name'),
+        ('input', 'placeholder', 'first'),
+        ('input', 'placeholder', 'last'),
+        ('input', 'type', 'text'),
+    ),
+    'email': (
+        ('input', 'name', 'email'),
+        ('input', 'type', 'email'),
+        ('input', 'placeholder', 'email'),
+        ('input', 'id', 'email'),
+        ('input', 'placeholder', 'e-mail'),
+    ),
+    'phone': (
+        ('input', 'name', 'phone'),
+        ('input', 'name', 'tel'),
+        ('input', 'type', 'tel'),
+        ('input', 'placeholder', 'phone'),
+        ('input', 'placeholder', 'telephone'),
+    ),
+    'subject': (
+        ('input', 'name', 'subject'),
+        ('input', 'placeholder', 'subject'),
+        ('input', 'id', 'subject'),
+        ('input', 'placeholder', 'topic'),
+    ),
+    'message': (
+        ('textarea', 'name', 'message'),
+        ('textarea', 'placeholder', 'message'),
+        ('textarea', 'id', 'message'),
+        ('textarea', None, None),
+        ('input', 'name', 'message'),
+    ),
+}
+
+_RECAPTCHA_SELECTORS = ('.g-recaptcha', '[data-sitekey]', 'iframe[src*="recaptcha"]', '#recaptcha')
+_HCAPTCHA_SELECTORS = ('.h-captcha', 'iframe[src*="hcaptcha"]', '#hcaptcha')
+_IMAGE_CAPTCHA_SELECTORS = ('img[src*="captcha"]', '.captcha-image', '#captcha-image')
+
+# Detection order matters: the first group found decides the CAPTCHA type
+_CAPTCHA_SELECTOR_GROUPS = {
+    'recaptcha': ', '.join(_RECAPTCHA_SELECTORS),
+    'hcaptcha': ', '.join(_HCAPTCHA_SELECTORS),
+    'image': ', '.join(_IMAGE_CAPTCHA_SELECTORS),
+}
+_CAPTCHA_LABELS = {'recaptcha': 'reCAPTCHA', 'hcaptcha': 'hCaptcha', 'image': 'Image CAPTCHA'}
+_CAPTCHA_DETECT_JS = """
+(groups) => Object.fromEntries(Object.entries(groups).map(([kind, selector]) => [kind, !!document.querySelector(selector)]))
+"""
+
+_SUBMIT_SELECTORS = (
+    'input[type="submit"]',
+    'button[type="submit"]',
+    'button:has-text("Send")',
+    'button:has-text("Submit")',
+    'button:has-text("Contact")',
+    'input[value*="Send" i]',
+    'input[value*="Submit" i]',
+)
+_SUBMIT_BUTTON_SELECTOR = ', '.join(f'{selector}:visible' for selector in _SUBMIT_SELECTORS)
+
+# Post-submit confirmation: a Playwright text selector to wait on, and a regex for the page content
+_CONFIRMATION_SELECTOR = 'text=/thank|success|received|sent|confirmation/i'
+_SUCCESS_RE = re.compile(r'\b(?:thank\s*you|success|submitted|received|sent|confirmation)\b', re.I)
+
+# Returns every input/textarea (in document order, matching locator('input, textarea').nth) in one round-trip
+_FIELD_SWEEP_JS = """
+() => Array.from(document.querySelectorAll('input, textarea')).map((el, idx) => ({
+    idx,
+    tag: el.tagName.toLowerCase(),
+    type: (el.getAttribute('type') || '').toLowerCase(),
+    name: (el.getAttribute('name') || '').toLowerCase(),
+    id: (el.id || '').toLowerCase(),
+    placeholder: (el.getAttribute('placeholder') || '').toLowerCase(),
+    visible: el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden',
+    disabled: el.disabled
+}))
+"""
+
+# Uses the prototype's native value setter so framework-controlled inputs (React etc.) see the change
+_SET_VALUE_JS = """
+(el, value) => {
+    const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+    setter.call(el, value);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return el.value === value;
+}
+"""
+
+def _field_matches(field: Dict[str, Any], rule) -> bool:
+    """Check a swept field against one (tag, attribute, needle) rule"""
+    tag, attr, needle = rule
+    if field['tag'] != tag:
+        return False
+    if attr is None:
+        return True
+    if attr == 'type':
+        return field['type'] == needle
+    return needle in field[attr]
+
+# Resource types a contact form never needs; aborting them cuts bytes fetched and time to a usable DOM
+_BLOCKED_RESOURCE_TYPES = frozenset({'font', 'image', 'media', 'stylesheet', 'texttrack'})
+
+# A page is replaced with a fresh one after this many submissions, so renderer memory doesn't drift upward
+PAGE_RECYCLE_AFTER = 100
+
 class PlaywrightFormSubmitter:
     """Enhanced form submitter using Playwright for JavaScript execution"""
     
@@ -20,32 +137,79 @@ class PlaywrightFormSubmitter:
         self.captcha_solver = CaptchaSolver()
         self.browser = None
         self.context = None
-        self.page = None
+        self.page_pool: Optional[asyncio.Queue] = None
+        self.pages: List[Page] = []
+        self._page_uses: Dict[Page, int] = {}
+        self._init_lock = asyncio.Lock()
+        
+        # Plain HTTP submitter for the no-browser fast path, and domains known to need the browser
+        self.http_submitter = FormSubmitter()
+        self._requires_js: Set[str] = set()
+        
+        # One submission at a time per domain, so batches don't hit the same host in parallel
+        self._domain_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         
     async def initialize(self):
-        """Initialize Playwright browser"""
+        """Initialize Playwright browser and a pool of pre-warmed pages"""
+        async with self._init_lock:
+            if self.page_pool is not None:
+                return True
+            return await self._initialize()
+    
+    async def _initialize(self):
         try:
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,  # Run in background
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--no-first-run',
-                    '--no-zygote',
-                    '--disable-gpu'
-                ]
-            )
-            self.context = await self.browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
-            self.page = await self.context.new_page()
+            context_options = {
+                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'viewport': {'width': 1920, 'height': 1080}
+            }
             
-            # Set extra headers to appear more human-like
-            await self.page.set_extra_http_headers({
+            if config.PLAYWRIGHT_CDP_URL:
+                # Attach to an already-running Chrome shared by several workers
+                self.browser = await self.playwright.chromium.connect_over_cdp(config.PLAYWRIGHT_CDP_URL)
+                self.context = await self.browser.new_context(**context_options)
+            else:
+                # headless=True launches chromium-headless-shell, which skips the full browser UI stack;
+                # the "chromium" channel switches to full Chromium's headless mode instead
+                launch_options = {
+                    'headless': True,  # Run in background
+                    'args': [
+                        '--no-sandbox',
+                        '--disable-setuid-sandbox',
+                        '--disable-dev-shm-usage',
+                        '--disable-accelerated-2d-canvas',
+                        '--no-first-run',
+                        '--no-zygote',
+                        '--disable-gpu',
+                        '--disable-extensions',
+                        '--disable-background-networking'
+                    ],
+                }
+                if not config.PLAYWRIGHT_HEADLESS_SHELL:
+                    launch_options['channel'] = 'chromium'
+                
+                if config.PLAYWRIGHT_USER_DATA_DIR:
+                    # Opt-in persistent profile: caches survive between runs, but Chromium locks the
+                    # directory, so every concurrently running process needs its own
+                    self.browser = None
+                    self.context = await self.playwright.chromium.launch_persistent_context(
+                        config.PLAYWRIGHT_USER_DATA_DIR, **launch_options, **context_options
+                    )
+                else:
+                    # Fresh context per browser start, so one site's cookies never reach another's form
+                    self.browser = await self.playwright.chromium.launch(**launch_options)
+                    self.context = await self.browser.new_context(**context_options)
+            
+            # Fail fast on fields that never become actionable instead of Playwright's 30s default
+            self.context.set_default_timeout(5000)
+            self.context.set_default_navigation_timeout(15000)
+            
+            # Skip fonts, images, media and CSS on every page (PLAYWRIGHT_BLOCK_RESOURCES=false to disable)
+            if config.PLAYWRIGHT_BLOCK_RESOURCES:
+                await self.context.route("**/*", self._route_filter)
+            
+            # Set extra headers to appear more human-like (applies to every page in the context)
+            await self.context.set_extra_http_headers({
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
                 'Accept-Language': 'en-US,en;q=0.5',
                 'Accept-Encoding': 'gzip, deflate',
@@ -54,7 +218,16 @@ class PlaywrightFormSubmitter:
                 'Upgrade-Insecure-Requests': '1',
             })
             
-            logger.info("✅ Playwright browser initialized successfully")
+            # Pages are handed out one per submission, so up to PLAYWRIGHT_PAGES forms run in parallel
+            # (a persistent context opens with a blank page already, which joins the pool)
+            self.pages = list(self.context.pages)
+            while len(self.pages) < max(1, config.PLAYWRIGHT_PAGES):
+                self.pages.append(await self.context.new_page())
+            self.page_pool = asyncio.Queue()
+            for page in self.pages:
+                self.page_pool.put_nowait(page)
+            
+            logger.info(f"✅ Playwright browser initialized successfully ({len(self.pages)} pages)")
             return True
             
         except Exception as e:
@@ -62,19 +235,67 @@ class PlaywrightFormSubmitter:
             return False
     
     async def close(self):
-        """Close Playwright browser"""
+        """Close Playwright browser; the next JS submission starts it again"""
+        async with self._init_lock:
+            if self.context is None and not hasattr(self, 'playwright'):
+                return
+            try:
+                for page in self.pages:
+                    await page.close()
+                if self.context:
+                    await self.context.close()
+                if self.browser:
+                    # Over CDP this only disconnects; the shared Chrome keeps running
+                    await self.browser.close()
+                if hasattr(self, 'playwright'):
+                    await self.playwright.stop()
+                logger.info("✅ Playwright browser closed")
+            except Exception as e:
+                logger.error(f"❌ Error closing Playwright: {e}")
+            finally:
+                self.pages = []
+                self._page_uses.clear()
+                self.page_pool = None
+                self.context = None
+                self.browser = None
+                self.__dict__.pop('playwright', None)
+    
+    @staticmethod
+    async def _route_filter(route):
+        """Abort requests for resources that don't affect filling in a form"""
+        if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    @contextlib.asynccontextmanager
+    async def _acquire_page(self):
+        """Borrow a page from the pool; it is reset to a blank page if the submission failed"""
+        page = await self.page_pool.get()
         try:
-            if self.page:
-                await self.page.close()
-            if self.context:
-                await self.context.close()
-            if self.browser:
-                await self.browser.close()
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
-            logger.info("✅ Playwright browser closed")
+            yield page
+        except Exception:
+            with contextlib.suppress(Exception):
+                await page.goto('about:blank')
+            raise
+        finally:
+            self._page_uses[page] = self._page_uses.get(page, 0) + 1
+            if self._page_uses[page] >= PAGE_RECYCLE_AFTER:
+                page = await self._recycle_page(page)
+            self.page_pool.put_nowait(page)
+    
+    async def _recycle_page(self, page: Page) -> Page:
+        """Swap a well-used page for a fresh one from the same context"""
+        try:
+            fresh = await self.context.new_page()
         except Exception as e:
-            logger.error(f"❌ Error closing Playwright: {e}")
+            logger.debug("Keeping page, could not open a replacement: %s", e)
+            return page
+        with contextlib.suppress(Exception):
+            await page.close()
+        self._page_uses.pop(page, None)
+        self.pages[self.pages.index(page)] = fresh
+        return fresh
     
     async def submit_contact_form(self, site: BusinessSite, message: OutreachMessage) -> ContactForm:
         """
@@ -87,133 +308,197 @@ class PlaywrightFormSubmitter:
                 error_message="No contact form found"
             )
         
+        # Plain HTML forms can be posted directly, without paying for a browser render;
+        # once the static path has posted, its result stands and the browser never resends
+        if site.domain not in self._requires_js:
+            static_result = await self._try_static_submit(site, message)
+            if static_result:
+                return static_result
+        
+        submit_attempted = False
+        
+        if self.page_pool is None and not await self.initialize():
+            return ContactForm(
+                url=str(site.contact_form_url),
+                error_message="Playwright browser unavailable"
+            )
+        
         try:
             form_url = str(site.contact_form_url)
             logger.info(f"🌐 Navigating to {form_url} with Playwright")
             
-            # Navigate to the page
-            await self.page.goto(form_url, wait_until='networkidle', timeout=30000)
-            
-            # Wait for page to load
-            await self.page.wait_for_load_state('domcontentloaded')
-            
-            # Check for CAPTCHA
-            captcha_detected = await self._detect_captcha()
-            
-            if captcha_detected:
-                logger.info(f"🔍 CAPTCHA detected on {site.domain}")
-                captcha_solved = await self._solve_captcha()
-                if not captcha_solved:
+            async with self._acquire_page() as page:
+                # Navigate to the page; the form only needs the DOM, not network silence
+                await page.goto(form_url, wait_until='domcontentloaded')
+                
+                # Wait for form fields to appear (JS-rendered forms), not a fixed delay
+                try:
+                    await page.wait_for_selector('form, textarea, input[type=email]', timeout=5000)
+                except PlaywrightTimeoutError:
+                    logger.debug("No form fields appeared on %s within 5s", form_url)
+                
+                # Check for CAPTCHA
+                captcha_type = await self._detect_captcha(page)
+                
+                if captcha_type:
+                    logger.info(f"🔍 CAPTCHA detected on {site.domain}")
+                    captcha_solved = await self._solve_captcha(page, captcha_type)
+                    if not captcha_solved:
+                        return ContactForm(
+                            url=form_url,
+                            has_captcha=True,
+                            captcha_type=captcha_type,
+                            error_message="Failed to solve CAPTCHA"
+                        )
+                
+                # Find and fill the contact form
+                form_filled = await self._fill_contact_form(page, message, site)
+                
+                if not form_filled:
                     return ContactForm(
                         url=form_url,
-                        has_captcha=True,
-                        error_message="Failed to solve CAPTCHA"
+                        error_message="Could not find or fill contact form"
+                    )
+                
+                # Submit the form
+                submit_attempted = True
+                submission_success = await self._submit_form(page)
+                
+                if submission_success:
+                    logger.info(f"✅ Successfully submitted contact form for {site.domain}")
+                    # data_manager.add_log("FORM_SUBMISSION", site.domain, "SUCCESS")  # Commented out due to missing method
+                    return ContactForm(
+                        url=form_url,
+                        submitted=True,
+                        submission_attempted=True,
+                        has_captcha=bool(captcha_type),
+                        captcha_type=captcha_type
+                    )
+                else:
+                    logger.warning(f"⚠️ Form submission may have failed for {site.domain}")
+                    return ContactForm(
+                        url=form_url,
+                        submitted=False,
+                        submission_attempted=True,
+                        error_message="Form submission failed"
                     )
-            
-            # Find and fill the contact form
-            form_filled = await self._fill_contact_form(message, site)
-            
-            if not form_filled:
-                return ContactForm(
-                    url=form_url,
-                    error_message="Could not find or fill contact form"
-                )
-            
-            # Submit the form
-            submission_success = await self._submit_form()
-            
-            if submission_success:
-                logger.info(f"✅ Successfully submitted contact form for {site.domain}")
-                # data_manager.add_log("FORM_SUBMISSION", site.domain, "SUCCESS")  # Commented out due to missing method
-                return ContactForm(
-                    url=form_url,
-                    submitted=True,
-                    has_captcha=captcha_detected
-                )
-            else:
-                logger.warning(f"⚠️ Form submission may have failed for {site.domain}")
-                return ContactForm(
-                    url=form_url,
-                    submitted=False,
-                    error_message="Form submission failed"
-                )
                 
         except Exception as e:
             logger.error(f"❌ Error submitting contact form for {site.domain}: {e}")
             # data_manager.add_log("FORM_SUBMISSION", site.domain, "ERROR", str(e))  # Commented out due to missing method
             return ContactForm(
                 url=str(site.contact_form_url) if site.contact_form_url else str(site.url),
+                submission_attempted=submit_attempted,
                 error_message=str(e)
             )
     
-    async def _detect_captcha(self) -> bool:
-        """Detect if CAPTCHA is present on the page"""
+    async def submit_contact_forms(self, submissions: List[Tuple[BusinessSite, OutreachMessage]],
+                                   concurrency: Optional[int] = None) -> List[ContactForm]:
+        """Submit many contact forms with bounded concurrency; results are in input order"""
+        semaphore = asyncio.Semaphore(concurrency or max(1, config.PLAYWRIGHT_PAGES))
+        
+        async def submit_one(site: BusinessSite, message: OutreachMessage) -> ContactForm:
+            async with semaphore, self._domain_locks[site.domain]:
+                return await self.submit_contact_form(site, message)
+        
+        results = await asyncio.gather(*(submit_one(site, message) for site, message in submissions), return_exceptions=True)
+        
+        contact_forms: List[ContactForm] = []
+        for (site, _), result in zip(submissions, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Error submitting contact form for {site.domain}: {result!r}")
+                result = ContactForm(url=str(site.contact_form_url or site.url), error_message=str(result))
+            contact_forms.append(result)
+        
+        logger.info(f"✅ Submitted {sum(1 for form in contact_forms if form.submitted)}/{len(submissions)} contact forms")
+        return contact_forms
+    
+    async def _try_static_submit(self, site: BusinessSite, message: OutreachMessage) -> Optional[ContactForm]:
+        """
+        Submit the contact form over plain HTTP when the page serves a static form
+        Returns None when the browser is needed (page fetch failed, no static message/email field, or CAPTCHA);
+        once the form has been posted the outcome is returned as is, so the message is never sent twice.
+        Only a fetched page without a usable static form marks the domain as needing JS; a failed fetch
+        may be transient, so the static path is tried again next time
+        """
+        form_url = str(site.contact_form_url)
+        http = self.http_submitter
         try:
-            # Check for reCAPTCHA
-            recaptcha_selectors = [
-                '.g-recaptcha',
-                '[data-sitekey]',
-                'iframe[src*="recaptcha"]',
-                '#recaptcha'
-            ]
-            
-            for selector in recaptcha_selectors:
-                if await self.page.query_selector(selector):
-                    logger.info("🔍 reCAPTCHA detected")
-                    return True
-            
-            # Check for hCaptcha
-            hcaptcha_selectors = [
-                '.h-captcha',
-                'iframe[src*="hcaptcha"]',
-                '#hcaptcha'
-            ]
-            
-            for selector in hcaptcha_selectors:
-                if await self.page.query_selector(selector):
-                    logger.info("🔍 hCaptcha detected")
-                    return True
-            
-            # Check for image CAPTCHA
-            image_captcha_selectors = [
-                'img[src*="captcha"]',
-                '.captcha-image',
-                '#captcha-image'
-            ]
-            
-            for selector in image_captcha_selectors:
-                if await self.page.query_selector(selector):
-                    logger.info("🔍 Image CAPTCHA detected")
-                    return True
+            response = await asyncio.to_thread(http.session.get, form_url, timeout=15)
+            if response.status_code != 200:
+                return None
+            
+            soup = BeautifulSoup(response.content, 'html.parser')
+            form = http._find_contact_form(soup)
+            if not form or not (form.find('textarea') or form.find('input', attrs={'type': 'email'})):
+                self._requires_js.add(site.domain)
+                return None
+            if self.captcha_solver.detect_captcha_type(soup)['has_captcha']:
+                self._requires_js.add(site.domain)
+                return None
+            
+            form_data = http._prepare_form_data(form, message, site)
+        except Exception as e:
+            logger.debug("Static submit failed for %s, falling back to Playwright: %s", site.domain, e)
+            return None
+        
+        try:
+            submit_response = await asyncio.to_thread(
+                http.session.post, http._get_submit_url(form, form_url), data=form_data, timeout=15
+            )
+            success = http._check_submission_success(submit_response)
+            error_message = None if success else "Form submission not confirmed"
+        except Exception as e:
+            # The request may already have reached the site (e.g. a read timeout), so it isn't retried
+            success = False
+            error_message = str(e)
+        
+        if success:
+            logger.info(f"✅ Submitted static contact form for {site.domain} without a browser")
+        else:
+            logger.warning(f"⚠️ Static contact form for {site.domain} posted but not confirmed: {error_message}")
+        return ContactForm(
+            url=form_url,
+            form_fields=form_data,
+            submitted=success,
+            submission_attempted=True,
+            error_message=error_message
+        )
+    
+    async def _detect_captcha(self, page: Page) -> Optional[str]:
+        """Detect which CAPTCHA, if any, is on the page: 'recaptcha', 'hcaptcha', 'image' or None"""
+        try:
+            # All three checks in a single round-trip; each group is one OR-joined selector
+            found = await page.evaluate(_CAPTCHA_DETECT_JS, _CAPTCHA_SELECTOR_GROUPS)
             
-            return False
+            # First match in detection order decides the type
+            captcha_type = next((kind for kind in _CAPTCHA_SELECTOR_GROUPS if found[kind]), None)
+            if captcha_type:
+                logger.info(f"🔍 {_CAPTCHA_LABELS[captcha_type]} detected")
+            return captcha_type
             
         except Exception as e:
             logger.error(f"Error detecting CAPTCHA: {e}")
-            return False
+            return None
     
-    async def _solve_captcha(self) -> bool:
-        """Attempt to solve CAPTCHA"""
+    async def _solve_captcha(self, page: Page, captcha_type: str) -> bool:
+        """Attempt to solve the CAPTCHA found by _detect_captcha"""
         try:
-            # Try to solve reCAPTCHA
-            recaptcha_frame = await self.page.query_selector('iframe[src*="recaptcha"]')
-            if recaptcha_frame:
+            if captcha_type == 'recaptcha':
                 logger.info("🔄 Attempting to solve reCAPTCHA...")
                 # Click the reCAPTCHA checkbox
-                await self.page.click('.g-recaptcha')
-                await self.page.wait_for_timeout(2000)
+                await page.click('.g-recaptcha')
+                await page.wait_for_timeout(2000)
                 
                 # Check if solved
-                if await self.page.query_selector('.g-recaptcha[data-response]'):
+                if await page.query_selector('.g-recaptcha[data-response]'):
                     logger.info("✅ reCAPTCHA solved")
                     return True
             
-            # Try to solve hCaptcha
-            hcaptcha_frame = await self.page.query_selector('iframe[src*="hcaptcha"]')
-            if hcaptcha_frame:
+            elif captcha_type == 'hcaptcha':
                 logger.info("🔄 Attempting to solve hCaptcha...")
-                await self.page.click('.h-captcha')
-                await self.page.wait_for_timeout(2000)
+                await page.click('.h-captcha')
+                await page.wait_for_timeout(2000)
                 return True
             
             logger.warning("⚠️ Could not solve CAPTCHA automatically")
@@ -223,51 +508,9 @@ class PlaywrightFormSubmitter:
             logger.error(f"Error solving CAPTCHA: {e}")
             return False
     
-    async def _fill_contact_form(self, message: OutreachMessage, site: BusinessSite) -> bool:
+    async def _fill_contact_form(self, page: Page, message: OutreachMessage, site: BusinessSite) -> bool:
         """Find and fill contact form fields"""
         try:
-            # Common field selectors (more flexible)
-            field_selectors = {
-                'name': [
-                    'input[name*="name" i]',
-                    'input[placeholder*="name" i]',
-                    'input[id*="name" i]',
-                    'input[placeholder*="first" i]',
-                    'input[placeholder*="last" i]',
-                    'input[type="text"]'
-                ],
-                'email': [
-                    'input[name*="email" i]',
-                    'input[type="email"]',
-                    'input[placeholder*="email" i]',
-                    'input[id*="email" i]',
-                    'input[placeholder*="e-mail" i]'
-                ],
-                'phone': [
-                    'input[name*="phone" i]',
-                    'input[name*="tel" i]',
-                    'input[type="tel"]',
-                    'input[placeholder*="phone" i]',
-                    'input[placeholder*="telephone" i]'
-                ],
-                'subject': [
-                    'input[name*="subject" i]',
-                    'input[placeholder*="subject" i]',
-                    'input[id*="subject" i]',
-                    'input[placeholder*="topic" i]'
-                ],
-                'message': [
-                    'textarea[name*="message" i]',
-                    'textarea[placeholder*="message" i]',
-                    'textarea[id*="message" i]',
-                    'textarea',
-                    'input[name*="message" i]',
-                    'textarea[placeholder*="comment" i]',
-                    'textarea[placeholder*="inquiry" i]',
-                    'textarea[placeholder*="details" i]'
-                ]
-            }
-            
             # Field values
             field_values = {
                 'name': 'John Smith',
@@ -279,81 +522,53 @@ class PlaywrightFormSubmitter:
             
             fields_filled = 0
             
-            # Debug: List all form elements on the page
-            all_inputs = await self.page.query_selector_all('input')
-            all_textareas = await self.page.query_selector_all('textarea')
-            all_forms = await self.page.query_selector_all('form')
-            all_iframes = await self.page.query_selector_all('iframe')
-            logger.info(f"🔍 Found {len(all_inputs)} input fields, {len(all_textareas)} textarea fields, {len(all_forms)} forms, and {len(all_iframes)} iframes")
-            
-            # Wait a bit more for JavaScript to load
-            await self.page.wait_for_timeout(3000)
-            
-            # Check again after waiting
-            all_inputs_after = await self.page.query_selector_all('input')
-            all_textareas_after = await self.page.query_selector_all('textarea')
-            all_forms_after = await self.page.query_selector_all('form')
-            logger.info(f"🔍 After waiting: {len(all_inputs_after)} input fields, {len(all_textareas_after)} textarea fields, and {len(all_forms_after)} forms")
-            
-            # Get page title and URL for debugging
-            page_title = await self.page.title()
-            current_url = self.page.url
-            logger.info(f"📄 Page title: {page_title}")
-            logger.info(f"🌐 Current URL: {current_url}")
-            
-            # Check for iframes that might contain forms
-            if all_iframes:
-                logger.info("🔍 Checking iframes for forms...")
-                for i, iframe in enumerate(all_iframes):
-                    try:
-                        iframe_src = await iframe.get_attribute('src')
-                        logger.info(f"   Iframe {i}: src='{iframe_src}'")
-                        
-                        # Try to access iframe content
-                        iframe_content = await iframe.content_frame()
-                        if iframe_content:
-                            iframe_inputs = await iframe_content.query_selector_all('input')
-                            iframe_textareas = await iframe_content.query_selector_all('textarea')
-                            logger.info(f"   Iframe {i} content: {len(iframe_inputs)} inputs, {len(iframe_textareas)} textareas")
-                    except Exception as e:
-                        logger.debug(f"Could not access iframe {i}: {e}")
-            
-            # Use the updated element counts
-            all_inputs = all_inputs_after
-            all_textareas = all_textareas_after
-            all_forms = all_forms_after
+            # One DOM sweep collects every input/textarea with the attributes the field rules match on
+            target = page
+            fields = await page.evaluate(_FIELD_SWEEP_JS)
             
-            # Fill each field type
-            for field_type, selectors in field_selectors.items():
-                for selector in selectors:
+            # Embedded form widgets live in iframes; only look there when the page itself has no fields
+            if not fields:
+                for frame in page.frames[1:]:
                     try:
-                        field = await self.page.query_selector(selector)
-                        if field:
-                            # Check if field is visible and not disabled
-                            is_visible = await field.is_visible()
-                            is_disabled = await field.get_attribute('disabled')
-                            
-                            if is_visible and not is_disabled:
-                                # Get field info for debugging
-                                field_name = await field.get_attribute('name') or await field.get_attribute('id') or 'unknown'
-                                field_placeholder = await field.get_attribute('placeholder') or 'none'
-                                logger.info(f"🎯 Found {field_type} field: name='{field_name}', placeholder='{field_placeholder}'")
-                                
-                                # Clear the field first
-                                await field.click()
-                                await field.fill('')
-                                
-                                # Fill with appropriate value
-                                value = field_values[field_type]
-                                await field.fill(value)
-                                
-                                logger.info(f"✅ Filled {field_type} field")
-                                fields_filled += 1
-                                break  # Move to next field type
-                                
+                        fields = await frame.evaluate(_FIELD_SWEEP_JS)
                     except Exception as e:
-                        logger.debug(f"Could not fill {field_type} field: {e}")
+                        logger.debug("Could not access iframe %s: %s", frame.url, e)
                         continue
+                    if fields:
+                        logger.info(f"🔍 Using form fields from iframe: {frame.url}")
+                        target = frame
+                        break
+            
+            textarea_count = sum(1 for field in fields if field['tag'] == 'textarea')
+            logger.info(f"🔍 Found {len(fields) - textarea_count} input fields and {textarea_count} textarea fields on {page.url}")
+            
+            # Match field types in Python; each rule takes the first usable field it matches
+            field_inputs = target.locator('input, textarea')
+            used = set()
+            for field_type, rules in _FIELD_RULES.items():
+                field = next(
+                    (f for rule in rules for f in fields
+                     if f['idx'] not in used and f['visible'] and not f['disabled'] and _field_matches(f, rule)),
+                    None
+                )
+                if field is None:
+                    continue
+                
+                try:
+                    logger.info(f"🎯 Found {field_type} field: name='{field['name'] or field['id'] or 'unknown'}', placeholder='{field['placeholder'] or 'none'}'")
+                    element = field_inputs.nth(field['idx'])
+                    
+                    # Set the value and fire input/change in one round-trip; fall back to a real fill if it didn't take
+                    value = field_values[field_type]
+                    if not await element.evaluate(_SET_VALUE_JS, value):
+                        await element.fill(value)
+                    
+                    used.add(field['idx'])
+                    logger.info(f"✅ Filled {field_type} field")
+                    fields_filled += 1
+                    
+                except Exception as e:
+                    logger.debug("Could not fill %s field: %s", field_type, e)
             
             logger.info(f"📝 Filled {fields_filled} form fields")
             return fields_filled > 0
@@ -362,65 +577,41 @@ class PlaywrightFormSubmitter:
             logger.error(f"Error filling contact form: {e}")
             return False
     
-    async def _submit_form(self) -> bool:
+    async def _submit_form(self, page: Page) -> bool:
         """Submit the filled form"""
         try:
-            # Look for submit buttons
-            submit_selectors = [
-                'input[type="submit"]',
-                'button[type="submit"]',
-                'button:has-text("Send")',
-                'button:has-text("Submit")',
-                'button:has-text("Contact")',
-                'input[value*="Send" i]',
-                'input[value*="Submit" i]'
-            ]
+            # Look for submit buttons: one OR-joined selector, first visible match in a single DOM walk
+            submit_button = page.locator(_SUBMIT_BUTTON_SELECTOR).first
+            if not await submit_button.count():
+                logger.warning("⚠️ No submit button found")
+                return False
+            
+            # Click the submit button
+            logger.info("🚀 Clicking submit button")
+            await submit_button.click()
+            
+            # Wait for navigation or an in-place confirmation instead of a fixed delay
+            try:
+                await page.wait_for_load_state('domcontentloaded', timeout=5000)
+                await page.wait_for_selector(_CONFIRMATION_SELECTOR, timeout=5000)
+            except PlaywrightTimeoutError:
+                pass
+            
+            # Check for success indicators: visible text only (far smaller than serialized HTML), one regex scan
+            page_text = await page.evaluate("() => document.body ? document.body.innerText : ''")
+            
+            if match := _SUCCESS_RE.search(page_text):
+                logger.info(f"✅ Success indicator found: {match.group(0).lower()}")
+                return True
             
-            for selector in submit_selectors:
-                try:
-                    submit_button = await self.page.query_selector(selector)
-                    if submit_button and await submit_button.is_visible():
-                        logger.info(f"🚀 Clicking submit button: {selector}")
-                        
-                        # Click the submit button
-                        await submit_button.click()
-                        
-                        # Wait for navigation or response
-                        await self.page.wait_for_timeout(3000)
-                        
-                        # Check for success indicators
-                        success_indicators = [
-                            'thank you',
-                            'success',
-                            'submitted',
-                            'received',
-                            'sent',
-                            'confirmation'
-                        ]
-                        
-                        page_content = await self.page.content()
-                        page_text = page_content.lower()
-                        
-                        for indicator in success_indicators:
-                            if indicator in page_text:
-                                logger.info(f"✅ Success indicator found: {indicator}")
-                                return True
-                        
-                        # If no success indicator, check if we're on a different page
-                        current_url = self.page.url
-                        if 'thank' in current_url.lower() or 'success' in current_url.lower():
-                            logger.info("✅ Redirected to success page")
-                            return True
-                        
-                        logger.info("⚠️ No clear success indicator, but form was submitted")
-                        return True
-                        
-                except Exception as e:
-                    logger.debug(f"Could not click submit button {selector}: {e}")
-                    continue
+            # If no success indicator, check if we're on a different page
+            current_url = page.url
+            if 'thank' in current_url.lower() or 'success' in current_url.lower():
+                logger.info("✅ Redirected to success page")
+                return True
             
-            logger.warning("⚠️ No submit button found")
-            return False
+            logger.info("⚠️ No clear success indicator, but form was submitted")
+            return True
             
         except Exception as e:
             logger.error(f"Error submitting form: {e}")
@@ -1,6 +1,10 @@
+import atexit
 import logging
 import json
-from typing import Dict, Any, Optional, List
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Set, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -9,6 +13,14 @@ from app.phase2_models import QARequest, QAResponse, QAResult
 
 logger = logging.getLogger(__name__)
 
+# Review records are appended in batches: a burst of writes shares one file append
+QA_FLUSH_BATCH_SIZE = 20
+QA_FLUSH_INTERVAL = 5.0  # seconds a queued record may wait for others to batch with (a timer flushes it)
+
+def _review_order(qa_data: Dict[str, Any]) -> str:
+    """When a review record was last changed (ISO strings sort chronologically)"""
+    return qa_data.get('review_date') or qa_data.get('request_date') or ''
+
 class QAManager:
     """Manages human QA review process for SEO implementations"""
     
@@ -16,28 +28,96 @@ class QAManager:
         self.qa_log_file = Path("data/qa_reviews.jsonl")
         self.qa_log_file.parent.mkdir(exist_ok=True)
         self.qa_reviews: Dict[str, Dict[str, Any]] = {}
+        
+        # Review ids by status and by result, kept current on every change so reads never scan
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        self._by_result: Dict[str, Set[str]] = defaultdict(set)
+        self._indexed: Dict[str, Tuple[str, str]] = {}
+        self._pending_writes: List[Dict[str, Any]] = []
+        self._flush_timer: Optional[threading.Timer] = None
+        self._write_lock = threading.RLock()  # The flush timer runs on its own thread
         self._load_qa_reviews()
+        atexit.register(self.flush)
     
     def _load_qa_reviews(self):
         """Load existing QA reviews from file"""
         if self.qa_log_file.exists():
             try:
-                with open(self.qa_log_file, 'r') as f:
+                line_count = 0
+                # Binary mode: json.loads takes the raw line bytes, skipping a text-layer decode per chunk
+                with open(self.qa_log_file, 'rb') as f:
                     for line in f:
                         if line.strip():
                             data = json.loads(line)
-                            self.qa_reviews[data['business_site_id']] = data
+                            # Newest copy of a review wins, by review/request date (ties: later line)
+                            current = self.qa_reviews.get(data['business_site_id'])
+                            if current is None or _review_order(data) >= _review_order(current):
+                                self.qa_reviews[data['business_site_id']] = data
+                                self._index_review(data)
+                            line_count += 1
                 logger.info(f"Loaded {len(self.qa_reviews)} existing QA reviews")
+                
+                # Each update appends a full copy; rewrite once superseded copies dominate the file
+                if line_count > 2 * len(self.qa_reviews):
+                    self.compact()
             except Exception as e:
                 logger.error(f"Error loading QA reviews: {e}")
     
+    def _index_review(self, qa_data: Dict[str, Any]):
+        """Bring the status and result indexes in line with a review"""
+        business_site_id = qa_data['business_site_id']
+        current = (qa_data.get('status'), qa_data.get('qa_result'))
+        previous = self._indexed.get(business_site_id)
+        if previous == current:
+            return
+        
+        if previous is not None:
+            self._by_status[previous[0]].discard(business_site_id)
+            self._by_result[previous[1]].discard(business_site_id)
+        self._by_status[current[0]].add(business_site_id)
+        self._by_result[current[1]].add(business_site_id)
+        self._indexed[business_site_id] = current
+    
     def _save_qa_review(self, qa_data: Dict[str, Any]):
-        """Save QA review to file"""
-        try:
-            with open(self.qa_log_file, 'a') as f:
-                f.write(json.dumps(qa_data) + '\n')
-        except Exception as e:
-            logger.error(f"Error saving QA review: {e}")
+        """Queue QA review for saving; queued reviews are written in batches"""
+        with self._write_lock:
+            # Snapshot, since the in-memory record keeps changing after it's queued
+            self._pending_writes.append(dict(qa_data))
+            if len(self._pending_writes) >= QA_FLUSH_BATCH_SIZE:
+                self.flush()
+            elif self._flush_timer is None:
+                # A lone review still reaches disk within QA_FLUSH_INTERVAL
+                self._flush_timer = threading.Timer(QA_FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush(self):
+        """Write queued QA reviews to file with a single append"""
+        with self._write_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending_writes:
+                return
+            try:
+                with open(self.qa_log_file, 'a') as f:
+                    f.write(''.join(json.dumps(qa_data) + '\n' for qa_data in self._pending_writes))
+                self._pending_writes.clear()
+            except Exception as e:
+                logger.error(f"Error saving QA review: {e}")
+    
+    def compact(self):
+        """Rewrite the QA log with one line per review, dropping superseded copies"""
+        with self._write_lock:
+            self.flush()
+            tmp_file = self.qa_log_file.with_suffix('.jsonl.tmp')
+            try:
+                with open(tmp_file, 'w') as f:
+                    f.write(''.join(json.dumps(qa_data) + '\n' for qa_data in self.qa_reviews.values()))
+                os.replace(tmp_file, self.qa_log_file)
+                logger.info(f"✅ Compacted QA log to {len(self.qa_reviews)} reviews")
+            except Exception as e:
+                logger.error(f"Error compacting QA reviews: {e}")
     
     def request_qa_review(self, business_site_id: str, website_url: str,
                          changes_made: List[str], reviewer_email: str = None) -> Dict[str, Any]:
@@ -62,6 +142,7 @@ class QAManager:
         }
         
         self.qa_reviews[business_site_id] = qa_data
+        self._index_review(qa_data)
         self._save_qa_review(qa_data)
         
         # Send notification to reviewer
@@ -138,12 +219,25 @@ Thank you!"""
         
         qa_data = self.qa_reviews[business_site_id]
         
+        # A retried submission of the same verdict is a no-op, so it isn't logged twice
+        if (qa_data.get("status") == "completed" and qa_data.get("reviewer") == reviewer
+                and qa_data.get("qa_result") == qa_result.lower() and qa_data.get("reviewer_notes") == notes):
+            logger.info(f"📝 Duplicate QA response ignored for {business_site_id}")
+            return {
+                "success": True,
+                "duplicate": True,
+                "qa_result": qa_result,
+                "reviewer": reviewer,
+                "review_date": qa_data["review_date"]
+            }
+        
         # Update QA data
         qa_data["status"] = "completed"
         qa_data["qa_result"] = qa_result.lower()
         qa_data["reviewer"] = reviewer
         qa_data["reviewer_notes"] = notes
         qa_data["review_date"] = datetime.now().isoformat()
+        self._index_review(qa_data)
         
         # Save updated QA data
         self._save_qa_review(qa_data)
@@ -163,37 +257,27 @@ Thank you!"""
     
     def get_pending_qa_reviews(self) -> List[Dict[str, Any]]:
         """Get all pending QA reviews"""
-        return [
-            qa_data for qa_data in self.qa_reviews.values() 
-            if qa_data.get('status') == 'pending'
-        ]
+        return [self.qa_reviews[business_site_id] for business_site_id in self._by_status.get('pending', ())]
     
     def get_completed_qa_reviews(self) -> List[Dict[str, Any]]:
         """Get all completed QA reviews"""
-        return [
-            qa_data for qa_data in self.qa_reviews.values() 
-            if qa_data.get('status') == 'completed'
-        ]
+        return [self.qa_reviews[business_site_id] for business_site_id in self._by_status.get('completed', ())]
     
     def get_qa_reviews_by_result(self, result: str) -> List[Dict[str, Any]]:
         """Get QA reviews by result"""
-        return [
-            qa_data for qa_data in self.qa_reviews.values() 
-            if qa_data.get('qa_result') == result.lower()
-        ]
+        return [self.qa_reviews[business_site_id] for business_site_id in self._by_result.get(result.lower(), ())]
     
     def get_qa_summary(self) -> Dict[str, Any]:
         """Get summary of QA reviews"""
         try:
-            all_reviews = list(self.qa_reviews.values())
-            
-            total_reviews = len(all_reviews)
-            pending_reviews = len([r for r in all_reviews if r.get('status') == 'pending'])
-            completed_reviews = len([r for r in all_reviews if r.get('status') == 'completed'])
+            # Counts come straight from the maintained indexes
+            total_reviews = len(self.qa_reviews)
+            pending_reviews = len(self._by_status.get('pending', ()))
+            completed_reviews = len(self._by_status.get('completed', ()))
             
-            approved_reviews = len([r for r in all_reviews if r.get('qa_result') == 'approved'])
-            rejected_reviews = len([r for r in all_reviews if r.get('qa_result') == 'rejected'])
-            needs_revision = len([r for r in all_reviews if r.get('qa_result') == 'needs_revision'])
+            approved_reviews = len(self._by_result.get('approved', ()))
+            rejected_reviews = len(self._by_result.get('rejected', ()))
+            needs_revision = len(self._by_result.get('needs_revision', ()))
             
             approval_rate = (approved_reviews / completed_reviews * 100) if completed_reviews > 0 else 0
             
@@ -1,6 +1,8 @@
+import atexit
 import logging
 import time
-from typing import Dict, Any, Optional, List
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Set
 from datetime import datetime
 from pathlib import Path
 import json
@@ -11,6 +13,22 @@ from app.credentials_manager import credentials_manager
 
 logger = logging.getLogger(__name__)
 
+# Change keyword -> (handler, implemented label, note, error), checked in order against the lowercased change
+_CHANGE_HANDLERS = (
+    ("meta description", "_implement_meta_description", "Added meta description",
+     "Meta description updated successfully", "Failed to implement meta description"),
+    ("title tag", "_implement_title_tag", "Updated title tag",
+     "Title tag optimized", "Failed to implement title tag"),
+    ("alt text", "_implement_alt_text", "Added alt text to images",
+     "Alt text added to {image_count} images", "Failed to implement alt text"),
+    ("google business profile", "_implement_gbp_fixes", "Updated Google Business Profile",
+     "GBP hours, description, and categories updated", "Failed to implement GBP fixes"),
+    ("yelp", "_implement_yelp_fixes", "Updated Yelp listing",
+     "Yelp business information updated", "Failed to implement Yelp fixes"),
+    ("facebook", "_implement_facebook_fixes", "Updated Facebook page",
+     "Facebook business page optimized", "Failed to implement Facebook fixes"),
+)
+
 class SEOImplementer:
     """Handles automated SEO implementation using collected credentials"""
     
@@ -18,26 +36,49 @@ class SEOImplementer:
         self.implementation_log_file = Path("data/seo_implementations.jsonl")
         self.implementation_log_file.parent.mkdir(exist_ok=True)
         self.implementations: Dict[str, Dict[str, Any]] = {}
+        
+        # Implementation ids by status, kept current on every status change so reads never scan
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        self._indexed_status: Dict[str, str] = {}
         self._load_implementations()
+        
+        # One append handle for the process; each start_implementation flushes its records before returning
+        self._log_fh = open(self.implementation_log_file, 'a', buffering=1 << 16)
+        atexit.register(self._log_fh.close)
     
     def _load_implementations(self):
         """Load existing implementations from file"""
         if self.implementation_log_file.exists():
             try:
-                with open(self.implementation_log_file, 'r') as f:
+                # Binary mode: json.loads takes the raw line bytes, skipping a text-layer decode per chunk
+                with open(self.implementation_log_file, 'rb') as f:
                     for line in f:
                         if line.strip():
                             data = json.loads(line)
+                            # Later lines are newer copies of the same implementation: last one wins
                             self.implementations[data['business_site_id']] = data
+                            self._index_implementation(data)
                 logger.info(f"Loaded {len(self.implementations)} existing implementations")
             except Exception as e:
                 logger.error(f"Error loading implementations: {e}")
     
+    def _index_implementation(self, implementation_data: Dict[str, Any]):
+        """Bring the status index in line with an implementation"""
+        business_site_id = implementation_data['business_site_id']
+        status = implementation_data.get('status')
+        previous = self._indexed_status.get(business_site_id)
+        if previous == status:
+            return
+        
+        if previous is not None:
+            self._by_status[previous].discard(business_site_id)
+        self._by_status[status].add(business_site_id)
+        self._indexed_status[business_site_id] = status
+    
     def _save_implementation(self, implementation_data: Dict[str, Any]):
         """Save implementation to file"""
         try:
-            with open(self.implementation_log_file, 'a') as f:
-                f.write(json.dumps(implementation_data) + '\n')
+            self._log_fh.write(json.dumps(implementation_data) + '\n')
         except Exception as e:
             logger.error(f"Error saving implementation: {e}")
     
@@ -67,6 +108,7 @@ class SEOImplementer:
         }
         
         self.implementations[business_site_id] = implementation_data
+        self._index_implementation(implementation_data)
         self._save_implementation(implementation_data)
         
         # Simulate implementation process
@@ -75,7 +117,9 @@ class SEOImplementer:
         if success:
             implementation_data["status"] = "completed"
             implementation_data["completion_time"] = datetime.now().isoformat()
+            self._index_implementation(implementation_data)
             self._save_implementation(implementation_data)
+            self._log_fh.flush()
             
             logger.info(f"✅ SEO implementation completed for {business_site_id}")
             return {
@@ -86,7 +130,9 @@ class SEOImplementer:
         else:
             implementation_data["status"] = "failed"
             implementation_data["completion_time"] = datetime.now().isoformat()
+            self._index_implementation(implementation_data)
             self._save_implementation(implementation_data)
+            self._log_fh.flush()
             
             logger.error(f"❌ SEO implementation failed for {business_site_id}")
             return {
@@ -107,66 +153,27 @@ class SEOImplementer:
             for change in changes:
                 logger.info(f"Implementing: {change}")
                 
-                # Simulate implementation time
-                time.sleep(1)
-                
-                # Implement based on change type
-                if "meta description" in change.lower():
-                    success = self._implement_meta_description(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Added meta description")
-                        notes.append(f"Meta description updated successfully")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement meta description")
+                # Simulated CMS delay, off unless a demo asks for it
+                if config.SIMULATE_LATENCY:
+                    time.sleep(config.SIMULATE_LATENCY)
                 
-                elif "title tag" in change.lower():
-                    success = self._implement_title_tag(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Updated title tag")
-                        notes.append(f"Title tag optimized")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement title tag")
-                
-                elif "alt text" in change.lower():
-                    success = self._implement_alt_text(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Added alt text to images")
-                        notes.append(f"Alt text added to {self._count_images(credentials)} images")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement alt text")
-                
-                elif "google business profile" in change.lower():
-                    success = self._implement_gbp_fixes(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Updated Google Business Profile")
-                        notes.append(f"GBP hours, description, and categories updated")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement GBP fixes")
-                
-                elif "yelp" in change.lower():
-                    success = self._implement_yelp_fixes(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Updated Yelp listing")
-                        notes.append(f"Yelp business information updated")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement Yelp fixes")
-                
-                elif "facebook" in change.lower():
-                    success = self._implement_facebook_fixes(credentials, change)
-                    if success:
-                        implemented_changes.append(f"Updated Facebook page")
-                        notes.append(f"Facebook business page optimized")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement Facebook fixes")
+                # Implement based on change type: first matching keyword wins, otherwise a generic fix
+                change_lower = change.lower()
+                for keyword, method_name, implemented, note, error in _CHANGE_HANDLERS:
+                    if keyword in change_lower:
+                        break
+                else:
+                    method_name = '_implement_generic_fix'
+                    implemented, note, error = change, f"Successfully implemented: {change}", f"Failed to implement: {change}"
                 
+                success = getattr(self, method_name)(credentials, change)
+                if success:
+                    implemented_changes.append(implemented)
+                    if method_name == '_implement_alt_text':
+                        note = note.format(image_count=self._count_images(credentials))
+                    notes.append(note)
                 else:
-                    # Generic implementation
-                    success = self._implement_generic_fix(credentials, change)
-                    if success:
-                        implemented_changes.append(change)
-                        notes.append(f"Successfully implemented: {change}")
-                    else:
-                        implementation_data["errors"].append(f"Failed to implement: {change}")
+                    implementation_data["errors"].append(error)
             
             # Update implementation data
             implementation_data["changes_implemented"] = implemented_changes
@@ -279,19 +286,18 @@ class SEOImplementer:
     
     def get_implementations_by_status(self, status: str) -> List[Dict[str, Any]]:
         """Get implementations by status"""
-        return [impl for impl in self.implementations.values() if impl.get('status') == status]
+        return [self.implementations[business_site_id] for business_site_id in self._by_status.get(status, ())]
     
     def get_implementation_summary(self) -> Dict[str, Any]:
         """Get summary of all implementations"""
         try:
-            implementations = self.get_all_implementations()
-            
-            total_implementations = len(implementations)
-            completed = len([impl for impl in implementations if impl.get('status') == 'completed'])
-            failed = len([impl for impl in implementations if impl.get('status') == 'failed'])
-            in_progress = len([impl for impl in implementations if impl.get('status') == 'started'])
+            # Status counts come straight from the index; only the change total needs a pass
+            total_implementations = len(self.implementations)
+            completed = len(self._by_status.get('completed', ()))
+            failed = len(self._by_status.get('failed', ()))
+            in_progress = len(self._by_status.get('started', ()))
             
-            total_changes = sum(len(impl.get('changes_implemented', [])) for impl in implementations)
+            total_changes = sum(len(impl.get('changes_implemented', [])) for impl in self.implementations.values())
             
             return {
                 "total_implementations": total_implementations,
@@ -1,12 +1,27 @@
+import asyncio
+import atexit
 import json
 import logging
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter, deque
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple, Type
 from datetime import datetime
+from urllib.parse import urlparse
 from app.config import config
 
 logger = logging.getLogger(__name__)
 
+# scheme://netloc prefix of an absolute URL; group 1 is exactly what urlparse reports as netloc
+_NETLOC_RE = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)')
+
+# Most recent activity-log entries kept in memory for status views
+RECENT_LOG_ENTRIES = 10_000
+
 class DataManager:
     """Manages data storage and retrieval for the SEO outreach tool"""
     
@@ -16,10 +31,28 @@ class DataManager:
         
         # File paths
         self.blacklist_file = self.data_dir / "blacklist.json"
-        self.logs_file = self.data_dir / "logs.json"
+        self.logs_file = self.data_dir / "logs.jsonl"  # One JSON entry per line, appended
+        self._legacy_logs_file = self.data_dir / "logs.json"
+        
+        # The blacklist lives in memory (a dict used as an insertion-ordered set); disk is only touched on changes
+        self._blacklist: Dict[str, None] = {}
+        self._blacklist_dirty = False
+        
+        # While a batch is open, log lines are held until commit_batch (blacklist additions never wait:
+        # they are what stops a business being contacted twice after a crash)
+        self._batch_depth = 0
+        self._pending_log_lines: List[str] = []
+        
+        # Running view of the activity log, so status reads never re-parse the file
+        self._recent_logs: deque = deque(maxlen=RECENT_LOG_ENTRIES)
+        self._log_counts: Counter = Counter()  # (action, status) -> entries
+        self.log_count = 0
         
         # Initialize files if they don't exist
         self._initialize_files()
+        self._reset_log_tracking(self.load_logs())
+        self._blacklist = dict.fromkeys(self._read_blacklist_file())
+        atexit.register(self._flush_at_exit)
     
     def _initialize_files(self):
         """Initialize data files if they don't exist"""
@@ -27,66 +60,135 @@ class DataManager:
             self.save_blacklist([])
         
         if not self.logs_file.exists():
-            self.save_logs([])
+            # Carry entries over from the old single-array logs.json once
+            legacy_logs = []
+            if self._legacy_logs_file.exists():
+                try:
+                    legacy_logs = json.loads(self._legacy_logs_file.read_bytes())
+                    logger.info(f"✅ Migrated {len(legacy_logs)} log entries to {self.logs_file.name}")
+                except Exception as e:
+                    logger.error(f"❌ Error migrating legacy logs: {e}")
+            self.save_logs(legacy_logs)
     
     def add_to_blacklist(self, domain: str):
         """Add a domain to the blacklist"""
         try:
-            blacklist = self.load_blacklist()
-            if domain not in blacklist:
-                blacklist.append(domain)
-                self.save_blacklist(blacklist)
+            if domain not in self._blacklist:
+                self._blacklist[domain] = None
+                self._blacklist_dirty = True
+                self.flush_blacklist()
                 logger.info(f"✅ Added {domain} to blacklist")
         except Exception as e:
             logger.error(f"❌ Error adding to blacklist: {e}")
     
     def is_blacklisted(self, domain: str) -> bool:
         """Check if a domain is blacklisted"""
-        try:
-            blacklist = self.load_blacklist()
-            return domain in blacklist
-        except Exception as e:
-            logger.error(f"❌ Error checking blacklist: {e}")
-            return False
+        return domain in self._blacklist
     
     def load_blacklist(self) -> List[str]:
-        """Load the blacklist from file"""
+        """Load the blacklist (served from memory, including additions not yet flushed)"""
+        return list(self._blacklist)
+    
+    def _read_blacklist_file(self) -> List[str]:
+        """Read the blacklist from file"""
         try:
-            if self.blacklist_file.exists():
-                with open(self.blacklist_file, 'r') as f:
-                    return json.load(f)
+            return json.loads(self.blacklist_file.read_bytes())
+        except FileNotFoundError:
             return []
         except Exception as e:
             logger.error(f"❌ Error loading blacklist: {e}")
             return []
     
     def save_blacklist(self, blacklist: List[str]):
-        """Save the blacklist to file"""
+        """Replace the blacklist and save it to file"""
+        self._blacklist = dict.fromkeys(blacklist)
+        self._blacklist_dirty = True
+        self.flush_blacklist()
+    
+    def _flush_at_exit(self):
+        """Write anything still held by an open batch"""
+        self._batch_depth = min(self._batch_depth, 1)
+        self.commit_batch()
+    
+    def flush_blacklist(self):
+        """Write the blacklist to file if it changed since the last write"""
+        if not self._blacklist_dirty:
+            return
         try:
-            with open(self.blacklist_file, 'w') as f:
-                json.dump(blacklist, f, indent=2)
+            # Compact separators: these files are rewritten whole, so pretty-printing only costs time
+            self.blacklist_file.write_text(json.dumps(list(self._blacklist), separators=(',', ':')))
+            self._blacklist_dirty = False
         except Exception as e:
             logger.error(f"❌ Error saving blacklist: {e}")
     
-    def add_log_entry(self, action: str, domain: str, status: str, details: Dict[str, Any] = None):
-        """Add a log entry"""
+    def add_log_entry(self, action: str, domain: str, status: str, details: Dict[str, Any] = None,
+                      now: Optional[datetime] = None):
+        """Add a log entry (callers logging several entries at once can pass one shared `now`)"""
         try:
-            logs = self.load_logs()
-            
             log_entry = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': (now or datetime.now()).isoformat(),
                 'action': action,
                 'domain': domain,
                 'status': status,
                 'details': details or {}
             }
             
-            logs.append(log_entry)
-            self.save_logs(logs)
+            self._track_log(log_entry)
+            
+            # Append one line instead of re-reading and rewriting the whole log
+            line = json.dumps(log_entry, separators=(',', ':')) + '\n'
+            if self._batch_depth:
+                self._pending_log_lines.append(line)
+            else:
+                with open(self.logs_file, 'a') as f:
+                    f.write(line)
             
         except Exception as e:
             logger.error(f"❌ Error adding log entry: {e}")
     
+    def begin_batch(self):
+        """Hold log writes in memory until the matching commit_batch"""
+        self._batch_depth += 1
+    
+    def commit_batch(self):
+        """Close a batch; the outermost commit writes everything it held"""
+        self._batch_depth = max(0, self._batch_depth - 1)
+        if self._batch_depth:
+            return
+        
+        if self._pending_log_lines:
+            try:
+                with open(self.logs_file, 'a') as f:
+                    f.write(''.join(self._pending_log_lines))
+                self._pending_log_lines.clear()
+            except Exception as e:
+                logger.error(f"❌ Error adding log entries: {e}")
+        self.flush_blacklist()
+    
+    def _track_log(self, log_entry: Dict[str, Any]):
+        """Fold a log entry into the in-memory counts and recent entries"""
+        self._recent_logs.append(log_entry)
+        self._log_counts[(log_entry.get('action'), log_entry.get('status'))] += 1
+        self.log_count += 1
+    
+    def _reset_log_tracking(self, logs: List[Dict[str, Any]]):
+        """Rebuild the in-memory log view from a full list of entries"""
+        self._recent_logs.clear()
+        self._log_counts.clear()
+        self.log_count = 0
+        for log_entry in logs:
+            self._track_log(log_entry)
+    
+    def get_recent_logs(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent log entries, oldest first, served from memory"""
+        if limit is None or limit >= len(self._recent_logs):
+            return list(self._recent_logs)
+        return [self._recent_logs[i] for i in range(len(self._recent_logs) - limit, len(self._recent_logs))]
+    
+    def count_logs(self, action: str, statuses: Tuple[str, ...]) -> int:
+        """Number of log entries for an action with any of the given statuses"""
+        return sum(self._log_counts[(action, status)] for status in statuses)
+    
     def add_log(self, action: str, domain: str, status: str, details: str = None):
         """Add a log entry (alias for add_log_entry for compatibility)"""
         self.add_log_entry(action, domain, status, {'details': details} if details else {})
@@ -94,10 +196,14 @@ class DataManager:
     def load_logs(self) -> List[Dict[str, Any]]:
         """Load logs from file"""
         try:
-            if self.logs_file.exists():
-                with open(self.logs_file, 'r') as f:
-                    return json.load(f)
-            return []
+            try:
+                with open(self.logs_file, 'rb') as f:
+                    logs = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                logs = []
+            # Include entries still held by an open batch
+            logs.extend(json.loads(line) for line in self._pending_log_lines)
+            return logs
         except Exception as e:
             logger.error(f"❌ Error loading logs: {e}")
             return []
@@ -105,19 +211,18 @@ class DataManager:
     def save_logs(self, logs: List[Dict[str, Any]]):
         """Save logs to file"""
         try:
-            with open(self.logs_file, 'w') as f:
-                json.dump(logs, f, indent=2)
+            self._reset_log_tracking(logs)
+            self.logs_file.write_text(''.join(json.dumps(log, separators=(',', ':')) + '\n' for log in logs))
         except Exception as e:
             logger.error(f"❌ Error saving logs: {e}")
 
 # Utility functions
 def extract_domain(url: str) -> str:
     """Extract domain from URL"""
-    from urllib.parse import urlparse
-    
     try:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
+        # Regex fast path for the usual scheme://host/... form; urlparse for anything else
+        match = _NETLOC_RE.match(url)
+        domain = (match.group(1) if match else urlparse(url).netloc).lower()
         
         # Remove www. prefix
         if domain.startswith('www.'):
@@ -136,13 +241,70 @@ def clean_url(url: str) -> str:
 
 def is_valid_url(url: str) -> bool:
     """Check if URL is valid"""
-    from urllib.parse import urlparse
-    
     try:
+        # Regex fast path for the usual scheme://host/... form; urlparse for anything else
+        match = _NETLOC_RE.match(url)
+        if match and match.group(1):
+            return True
+        
         result = urlparse(url)
         return all([result.scheme, result.netloc])
     except Exception:
         return False
 
+async def retry_async(func: Callable, *args, max_retries: int = 3, base_delay: float = 1.0,
+                      max_delay: float = 30.0, jitter: float = 0.5,
+                      retry_on: Tuple[Type[BaseException], ...] = (ConnectionError, TimeoutError), **kwargs):
+    """
+    Await func(*args, **kwargs), retrying errors in retry_on with jittered exponential backoff.
+    Anything else (and the last failure) propagates to the caller.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await func(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt * (1 + random.uniform(0, jitter)))
+            logger.warning(f"⚠️ {getattr(func, '__name__', 'call')} failed ({e!r}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+_dns_cache: Dict[tuple, Tuple[float, Any]] = {}
+_dns_cache_lock = threading.Lock()
+_DNS_CACHE_MAX_ENTRIES = 4096
+
+def install_dns_cache(ttl: float):
+    """
+    Cache successful socket.getaddrinfo results process-wide for ttl seconds.
+    Audits try up to four URL variants per domain and probe its links, all resolving the same hosts.
+    This patches the socket module for every library in the process, so it is only called from
+    startup when DNS_CACHE_ENABLED is set.
+    Safe to call more than once; a ttl of 0 leaves resolution uncached.
+    """
+    if ttl <= 0 or getattr(socket.getaddrinfo, '_rankzen_cached', False):
+        return
+    
+    resolve = socket.getaddrinfo
+    
+    def cached_getaddrinfo(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _dns_cache_lock:
+            hit = _dns_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+        
+        # Failures are not cached, so a transient resolver error is retried on the next call
+        result = resolve(*args, **kwargs)
+        with _dns_cache_lock:
+            if len(_dns_cache) >= _DNS_CACHE_MAX_ENTRIES:
+                _dns_cache.clear()
+            _dns_cache[key] = (now + ttl, result)
+        return result
+    
+    cached_getaddrinfo._rankzen_cached = True
+    socket.getaddrinfo = cached_getaddrinfo
+    logger.debug("DNS cache installed (ttl=%ss)", ttl)
+
 # Create global data manager instance
 data_manager = DataManager()
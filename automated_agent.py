@@ -4,11 +4,11 @@ Rankzen Automated SEO Outreach Agent
 Runs independently to find, audit, and outreach to under-optimized local businesses
 """
 
+import contextlib
 import logging
 import time
-import schedule
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
 from pathlib import Path
 
 from app.config import config
@@ -20,7 +20,7 @@ from app.playwright_form_submitter import playwright_submitter
 import asyncio
 from app.csv_reporter import csv_reporter
 from app.utils import data_manager
-from app.phase2_orchestrator import Phase2Orchestrator
+from app.phase2_orchestrator import get_phase2_orchestrator
 import json
 
 # Configure logging
@@ -30,15 +30,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cycle reports land in the data directory, one file per cycle named after its timestamp
+_REPORTS_DIR = Path(config.DATA_DIR)
+_REPORT_NAME = "cycle_report_{:%Y%m%d_%H%M%S}.json"
+
 class AutomatedOutreachAgent:
     """Automated agent for SEO outreach to under-optimized local businesses"""
     
-    def __init__(self):
+    def __init__(self, concurrency: Optional[int] = None):
         self.discovery = BusinessDiscovery()
         self.seo_auditor = SEOAuditor()
         self.ai_reporter = AIReporter()
         self.form_submitter = FormSubmitter()
-        self.phase2_orchestrator = Phase2Orchestrator()
+        self.phase2_orchestrator = get_phase2_orchestrator()
+        
+        # Sites audited at once in a cycle (defaults to AUDIT_WORKERS)
+        self.concurrency = max(1, concurrency or config.AUDIT_WORKERS)
+        
+        # Long-lived hosts (the run_rankzen daemon) keep the browser between cycles; aclose() still closes it
+        self.keep_browser_open = False
         
         # Daily limits and tracking
         self.daily_audit_count = 0
@@ -55,21 +65,35 @@ class AutomatedOutreachAgent:
             'start_time': datetime.now()
         }
     
-    def reset_daily_limits(self):
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Release pooled connections held across cycles"""
+        await playwright_submitter.close()
+        await playwright_submitter.captcha_solver.aclose()
+        await self.form_submitter.captcha_solver.aclose()
+    
+    def reset_daily_limits(self, now: Optional[datetime] = None):
         """Reset daily counters"""
-        current_date = datetime.now().date()
+        current_date = (now or datetime.now()).date()
         if current_date > self.last_reset_date:
             logger.info("🔄 Resetting daily limits")
             self.daily_audit_count = 0
             self.daily_outreach_count = 0
             self.last_reset_date = current_date
     
-    def check_daily_limits(self) -> bool:
+    def check_daily_limits(self, now: Optional[datetime] = None, daily_cap: Optional[int] = None) -> bool:
         """Check if we've hit daily limits"""
-        self.reset_daily_limits()
+        self.reset_daily_limits(now)
         
-        if self.daily_audit_count >= config.DAILY_AUDITS:
-            logger.warning(f"⚠️ Daily audit limit reached ({config.DAILY_AUDITS})")
+        if daily_cap is None:
+            daily_cap = config.DAILY_AUDITS
+        if self.daily_audit_count >= daily_cap:
+            logger.warning(f"⚠️ Daily audit limit reached ({daily_cap})")
             return False
         
         return True
@@ -82,13 +106,13 @@ class AutomatedOutreachAgent:
             # Discover new business sites
             discovered_sites = self.discovery.discover_businesses(max_sites=max_sites)
             
-            # Filter out already blacklisted sites
-            new_sites = []
-            for site in discovered_sites:
-                if not data_manager.is_blacklisted(site.domain):
-                    new_sites.append(site)
-                else:
-                    logger.info(f"⏭️ Skipping blacklisted site: {site.domain}")
+            # Filter out already blacklisted sites, and repeats of a domain already taken this cycle
+            seen = set()
+            skipped = []
+            new_sites = [site for site in discovered_sites if self._is_new_site(site, seen, skipped)]
+            
+            if skipped:
+                logger.info(f"⏭️ Skipping {len(skipped)} blacklisted sites: {', '.join(skipped)}")
             
             logger.info(f"✅ Discovery cycle complete: {len(new_sites)} new sites found")
             self.stats['total_sites_discovered'] += len(new_sites)
@@ -99,13 +123,60 @@ class AutomatedOutreachAgent:
             logger.error(f"❌ Discovery cycle failed: {e}")
             return []
     
+    def _is_new_site(self, site, seen: set, skipped: List[str]) -> bool:
+        """True for a site that isn't blacklisted or a repeat of a domain in `seen`; blacklisted domains go to `skipped`"""
+        if site.domain in seen:
+            return False
+        seen.add(site.domain)
+        if data_manager.is_blacklisted(site.domain):
+            skipped.append(site.domain)
+            return False
+        return True
+    
+    async def stream_discovery_cycle(self, max_sites: int, discovered_sites: List) -> AsyncIterator:
+        """
+        Discovery cycle that yields each new site as soon as it is found (search runs in a worker thread).
+        Every yielded site is also appended to discovered_sites.
+        """
+        logger.info(f"🔍 Starting discovery cycle for {max_sites} sites")
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        def produce():
+            try:
+                for site in self.discovery.iter_businesses(max_sites=max_sites):
+                    loop.call_soon_threadsafe(queue.put_nowait, site)
+            except Exception as e:
+                logger.error(f"❌ Discovery cycle failed: {e}")
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        producer = asyncio.create_task(asyncio.to_thread(produce))
+        seen = set()
+        skipped = []
+        try:
+            while (site := await queue.get()) is not done:
+                if self._is_new_site(site, seen, skipped):
+                    discovered_sites.append(site)
+                    yield site
+        finally:
+            await producer
+        
+        if skipped:
+            logger.info(f"⏭️ Skipping {len(skipped)} blacklisted sites: {', '.join(skipped)}")
+        
+        logger.info(f"✅ Discovery cycle complete: {len(discovered_sites)} new sites found")
+        self.stats['total_sites_discovered'] += len(discovered_sites)
+    
     async def audit_site(self, site) -> Dict[str, Any]:
         """Audit a single site and generate outreach message"""
         try:
             logger.info(f"🔍 Auditing site: {site.domain}")
             
             # Perform SEO audit
-            seo_score = self.seo_auditor.audit_site(site)
+            seo_score = await asyncio.to_thread(self.seo_auditor.audit_site, site)
             
             # Only proceed if site needs improvement (score < 70)
             if seo_score.overall_score >= 70:
@@ -119,29 +190,29 @@ class AutomatedOutreachAgent:
                 }
             
             # Generate outreach message
-            outreach_message = self.ai_reporter.generate_outreach_message(site, seo_score)
+            outreach_message = await asyncio.to_thread(self.ai_reporter.generate_outreach_message, site, seo_score)
             
             # Find contact forms
-            contact_forms = self.discovery.find_contact_forms(str(site.url))
+            contact_forms = await asyncio.to_thread(self.discovery.find_contact_forms, str(site.url))
             contact_form_found = len(contact_forms) > 0
             
             # Submit outreach if contact form found
             outreach_sent = False
             if contact_form_found:
                 try:
-                    # Try Playwright first (for JavaScript forms)
+                    # Try Playwright first (for JavaScript forms); it posts static forms
+                    # over HTTP itself and only starts the browser when needed
                     logger.info(f"🌐 Attempting Playwright form submission for {site.domain}")
                     
-                    # Initialize Playwright if not already done
-                    if not playwright_submitter.page:
-                        await playwright_submitter.initialize()
-                    
                     # Set the contact form URL
                     site.contact_form_url = contact_forms[0] if contact_forms else None
                     
                     # Submit using Playwright
                     contact_form = await playwright_submitter.submit_contact_form(site, outreach_message)
                     outreach_sent = contact_form.submitted
+                    if contact_form.submission_attempted:
+                        # Straight to disk, before anything else can fail, so a crash never means a second contact
+                        data_manager.add_to_blacklist(site.domain)
                     
                     if outreach_sent:
                         logger.info(f"✅ Playwright outreach sent successfully to {site.domain}")
@@ -150,11 +221,16 @@ class AutomatedOutreachAgent:
                         
                         # Start Phase 2 workflow
                         await self.start_phase2_workflow(site, seo_score, outreach_message)
+                    elif contact_form.submission_attempted:
+                        # The form was already posted; resending would give the business a duplicate message
+                        logger.warning(f"⚠️ Outreach to {site.domain} was posted but not confirmed: {contact_form.error_message}")
                     else:
                         logger.warning(f"⚠️ Playwright failed, trying traditional method for {site.domain}")
                         # Fallback to traditional method
-                        contact_form = self.form_submitter.submit_contact_form(site, outreach_message)
+                        contact_form = await self.form_submitter.submit_contact_form(site, outreach_message)
                         outreach_sent = contact_form.submitted
+                        if contact_form.submission_attempted:
+                            data_manager.add_to_blacklist(site.domain)
                         
                         if outreach_sent:
                             logger.info(f"✅ Traditional outreach sent successfully to {site.domain}")
@@ -179,8 +255,7 @@ class AutomatedOutreachAgent:
             data_manager.add_to_blacklist(site.domain)
             self.stats['total_blacklisted'] += 1
             
-            # Update stats
-            self.daily_audit_count += 1
+            # Update stats (the daily audit slot was reserved by run_audit_cycle)
             self.stats['total_sites_audited'] += 1
             if contact_form_found:
                 self.stats['total_contact_forms_found'] += 1
@@ -203,27 +278,69 @@ class AutomatedOutreachAgent:
                 'error': str(e)
             }
     
-    async def run_audit_cycle(self, sites: List) -> List[Dict[str, Any]]:
-        """Run audit cycle on discovered sites"""
-        logger.info(f"🔍 Starting audit cycle for {len(sites)} sites")
+    async def run_audit_cycle(self, sites) -> List[Dict[str, Any]]:
+        """Run audit cycle on discovered sites (a list, or an async iterator still being discovered)"""
+        if hasattr(sites, '__aiter__'):
+            logger.info("🔍 Starting audit cycle for sites as they are discovered")
+        else:
+            logger.info(f"🔍 Starting audit cycle for {len(sites)} sites")
         
-        results = []
+        tasks = []
         
-        for site in sites:
-            # Check daily limits
-            if not self.check_daily_limits():
-                logger.warning("⚠️ Daily limits reached, stopping audit cycle")
-                break
-            
-            # Add delay between audits to respect rate limits
-            time.sleep(1)  # 1 second delay between audits
-            
-            # Audit the site
-            result = await self.audit_site(site)
-            results.append(result)
-            
-            # Log progress
-            logger.info(f"📊 Progress: {len(results)}/{len(sites)} sites audited")
+        completed = 0
+        cycle_now = datetime.now()  # One clock read (and one config read) for the cycle's daily-limit checks
+        daily_cap = config.DAILY_AUDITS
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def bounded_audit(site):
+            nonlocal completed
+            async with semaphore:
+                # Check daily limits (sites still queued when the limit is hit are skipped), reserving
+                # this site's slot up front so audits in flight can't overshoot the cap together
+                if not self.check_daily_limits(cycle_now, daily_cap):
+                    return None
+                self.daily_audit_count += 1
+                
+                result = None
+                try:
+                    # Add delay between audits to respect rate limits
+                    await asyncio.sleep(1)  # 1 second delay between audits
+                    
+                    # Audit the site
+                    result = await self.audit_site(site)
+                finally:
+                    # Only completed audits count toward the cap; skipped or failed ones give the slot back
+                    if not (result and result.get('audited')):
+                        self.daily_audit_count -= 1
+                completed += 1
+                
+                # Log progress (the total isn't known yet while discovery is still streaming sites in)
+                logger.info(f"📊 Progress: {completed} sites audited")
+                return result
+        
+        # Activity-log and CSV writes for the whole cycle go to disk once, at the end
+        # (blacklist additions are written immediately)
+        data_manager.begin_batch()
+        csv_reporter.begin_batch()
+        try:
+            # Up to self.concurrency sites in flight, so one site's network waits overlap another's
+            if hasattr(sites, '__aiter__'):
+                async for site in sites:
+                    tasks.append(asyncio.create_task(bounded_audit(site)))
+            else:
+                tasks = [asyncio.create_task(bounded_audit(site)) for site in sites]
+            ordered = await asyncio.gather(*tasks)
+        finally:
+            data_manager.commit_batch()
+            csv_reporter.commit_batch()
+            # The browser (started on the cycle's first JS-only form, if any) is shared by every
+            # submission in the cycle, then released instead of idling until the next cycle
+            if not self.keep_browser_open:
+                await playwright_submitter.close()
+        
+        results = [result for result in ordered if result is not None]
+        if len(results) < len(tasks):
+            logger.warning("⚠️ Daily limits reached, stopping audit cycle")
         
         logger.info(f"✅ Audit cycle complete: {len(results)} sites processed")
         return results
@@ -234,8 +351,9 @@ class AutomatedOutreachAgent:
         
         start_time = datetime.now()
         
-        # Step 1: Discovery
-        discovered_sites = self.run_discovery_cycle(max_sites)
+        # Step 1 + 2: Discovery and Audit/Outreach, pipelined so audits start on the first discovered site
+        discovered_sites = []
+        audit_results = await self.run_audit_cycle(self.stream_discovery_cycle(max_sites, discovered_sites))
         
         if not discovered_sites:
             logger.warning("⚠️ No new sites discovered, cycle complete")
@@ -252,9 +370,6 @@ class AutomatedOutreachAgent:
         discovered_domains = [site.domain for site in discovered_sites]
         logger.info(f"🔍 Discovered sites: {discovered_domains}")
         
-        # Step 2: Audit and Outreach
-        audit_results = await self.run_audit_cycle(discovered_sites)
-        
         # Calculate statistics
         audited_sites = [r for r in audit_results if r.get('audited', False)]
         outreach_sent = [r for r in audit_results if r.get('outreach_sent', False)]
@@ -274,8 +389,8 @@ class AutomatedOutreachAgent:
         # Log final statistics
         logger.info(f"✅ Full cycle complete: {cycle_stats}")
         
-        # Generate final report
-        self._generate_final_report(cycle_stats)
+        # Generate final report (summary, file write and console output in one hop off the event loop)
+        await asyncio.to_thread(self._generate_final_report, cycle_stats)
         
         return cycle_stats
     
@@ -300,26 +415,29 @@ class AutomatedOutreachAgent:
     async def monitor_phase2_responses(self):
         """Monitor and process Phase 2 client responses"""
         try:
-            # Check for pending client interactions that need processing
-            pending_interactions = self.phase2_orchestrator.get_pending_interactions()
+            # Advance stalled interactions (payment links, payment checks, credential requests) in bulk
+            await self.phase2_orchestrator.run_pending_sweep()
             
-            if pending_interactions:
-                logger.info(f"📧 Found {len(pending_interactions)} pending Phase 2 interactions")
-                
-                for interaction in pending_interactions:
-                    try:
-                        # Simulate checking for responses (in real implementation, this would check email/form responses)
-                        # For now, we'll just log the monitoring
-                        logger.debug(f"🔍 Monitoring interaction {interaction.get('business_site_id', 'unknown')}")
-                        
-                        # In a real implementation, you would:
-                        # 1. Check email for responses
-                        # 2. Check contact form submissions
-                        # 3. Check webhook responses
-                        # 4. Process positive responses automatically
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Error processing Phase 2 interaction: {e}")
+            # Check for pending client interactions that need processing (streamed, not materialized)
+            monitored = 0
+            for interaction in self.phase2_orchestrator.iter_pending_interactions():
+                monitored += 1
+                try:
+                    # Simulate checking for responses (in real implementation, this would check email/form responses)
+                    # For now, we'll just log the monitoring
+                    logger.debug("🔍 Monitoring interaction %s", interaction.get('business_site_id', 'unknown'))
+                    
+                    # In a real implementation, you would:
+                    # 1. Check email for responses
+                    # 2. Check contact form submissions
+                    # 3. Check webhook responses
+                    # 4. Process positive responses automatically
+                    
+                except Exception as e:
+                    logger.error(f"❌ Error processing Phase 2 interaction: {e}")
+            
+            if monitored:
+                logger.info(f"📧 Monitored {monitored} pending Phase 2 interactions")
                         
         except Exception as e:
             logger.error(f"❌ Error monitoring Phase 2 responses: {e}")
@@ -330,7 +448,7 @@ class AutomatedOutreachAgent:
             business_site_id = f"site_{site.domain.replace('.', '_')}_{int(time.time())}"
             
             # Start Phase 2 workflow
-            result = self.phase2_orchestrator.run_phase2_workflow(
+            result = await self.phase2_orchestrator.run_phase2_workflow(
                 business_site_id=business_site_id,
                 domain=site.domain,
                 business_name=site.business_name or site.domain,
@@ -354,9 +472,10 @@ class AutomatedOutreachAgent:
             # Get Phase 2 summary
             phase2_summary = self.phase2_orchestrator.get_workflow_summary()
             
-            # Create comprehensive report
+            # Create comprehensive report (one timestamp for both the report body and its file name)
+            now = datetime.now()
             report = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'cycle_stats': stats,
                 'phase2_summary': phase2_summary,
                 'agent_stats': self.get_agent_stats(),
@@ -367,7 +486,7 @@ class AutomatedOutreachAgent:
             }
             
             # Save report to file
-            report_file = Path(config.DATA_DIR) / f"cycle_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            report_file = _REPORTS_DIR / _REPORT_NAME.format(now)
             with open(report_file, 'w') as f:
                 json.dump(report, f, indent=2, default=str)
             
@@ -391,49 +510,67 @@ class AutomatedOutreachAgent:
         except Exception as e:
             logger.error(f"❌ Error generating final report: {e}")
 
-    async def run_continuous(self, cycle_interval_hours: float = 0.1, max_sites_per_cycle: int = 30):
-        """Run the agent continuously with scheduled cycles"""
-        logger.info(f"🤖 Starting continuous automated agent (cycles every {cycle_interval_hours} hours)")
-        
-        # Schedule regular cycles (we'll handle this differently for async)
-        # schedule.every(cycle_interval_hours).hours.do(
-        #     self.run_full_cycle, max_sites=max_sites_per_cycle
-        # )
-        
-        # Run initial cycle
-        logger.info("🚀 Running initial cycle...")
-        await self.run_full_cycle(max_sites_per_cycle)
-        
-        # Continuous loop
-        last_cycle_time = time.time()
-        cycle_interval_seconds = cycle_interval_hours * 3600
-        
+    async def _monitor_phase2_loop(self, interval_seconds: float = 60):
+        """Monitor Phase 2 responses on its own cadence, independent of the cycle schedule"""
         while True:
             try:
-                current_time = time.time()
-                
-                # Check if it's time for next cycle
-                if current_time - last_cycle_time >= cycle_interval_seconds:
-                    logger.info("🔄 Running scheduled cycle...")
-                    await self.run_full_cycle(max_sites_per_cycle)
-                    last_cycle_time = current_time
-                
                 # Phase 2: Monitor for client responses and process workflow
                 await self.monitor_phase2_responses()
                 
-                await asyncio.sleep(60)  # Check every minute
+                await asyncio.sleep(interval_seconds)  # Check every minute
                 
                 # Log status every hour
                 if datetime.now().minute == 0:
                     stats = self.get_agent_stats()
                     logger.info(f"📊 Agent Status: {stats}")
                     
-            except KeyboardInterrupt:
-                logger.info("🛑 Agent stopped by user")
-                break
             except Exception as e:
                 logger.error(f"❌ Agent error: {e}")
                 await asyncio.sleep(300)  # Wait 5 minutes before retrying
+    
+    async def run_continuous(self, cycle_interval_hours: float = 0.1, max_sites_per_cycle: int = 30,
+                             stop_event: Optional[asyncio.Event] = None):
+        """Run the agent continuously with scheduled cycles, until stop_event is set (after the running cycle)"""
+        stop = stop_event or asyncio.Event()
+        logger.info(f"🤖 Starting continuous automated agent (cycles every {cycle_interval_hours} hours)")
+        
+        # Run initial cycle
+        logger.info("🚀 Running initial cycle...")
+        await self.run_full_cycle(max_sites_per_cycle)
+        
+        # Cycles sleep straight until their deadline; Phase 2 monitoring runs alongside as its own task
+        loop = asyncio.get_running_loop()
+        cycle_interval_seconds = cycle_interval_hours * 3600
+        next_cycle = loop.time() + cycle_interval_seconds
+        monitor = asyncio.create_task(self._monitor_phase2_loop())
+        
+        try:
+            while not stop.is_set():
+                try:
+                    # Sleep until the deadline, waking early if a stop is requested
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(stop.wait(), timeout=max(0, next_cycle - loop.time()))
+                    if stop.is_set():
+                        break
+                    next_cycle = loop.time() + cycle_interval_seconds
+                    
+                    logger.info("🔄 Running scheduled cycle...")
+                    await self.run_full_cycle(max_sites_per_cycle)
+                    
+                except KeyboardInterrupt:
+                    logger.info("🛑 Agent stopped by user")
+                    break
+                except Exception as e:
+                    logger.error(f"❌ Agent error: {e}")
+                    # Wait 5 minutes before retrying (or less, if a stop is requested meanwhile)
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(stop.wait(), timeout=300)
+        finally:
+            # Wait for the monitor to unwind, so aclose() doesn't close sessions under a running sweep
+            monitor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await monitor
+        logger.info("🛑 Agent stopped")
 
 async def main():
     """Main function to run the automated agent"""
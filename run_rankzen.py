@@ -17,7 +17,11 @@ This script will:
 NO COMPLEX SETUP REQUIRED!
 """
 
+import hashlib
+import json
 import os
+import shutil
+import signal
 import sys
 import subprocess
 import asyncio
@@ -32,38 +36,119 @@ def check_python_version():
         sys.exit(1)
     print(f"✅ Python {sys.version_info.major}.{sys.version_info.minor} detected")
 
-def install_dependencies():
-    """Install required dependencies"""
-    print("📦 Installing dependencies...")
+# sha256 of the requirements file that was last installed successfully
+DEPS_HASH_FILE = Path("data/.deps_hash")
+
+# Fully pinned, hashed requirements (pip-compile --generate-hashes); preferred when present
+REQUIREMENTS_LOCK = Path("requirements.lock")
+
+# Cached Serper responses (see app.discovery.SERP_CACHE_DIR)
+SERP_CACHE_DIR = Path("data/serp_cache")
+
+# Unix socket a warm `daemon` process listens on; `test` runs its cycle there when it is up
+DAEMON_SOCKET = Path("data/rankzen.sock")
+
+# The form submitter runs chromium-headless-shell unless PLAYWRIGHT_HEADLESS_SHELL=false,
+# so only that (much smaller) build needs downloading
+HEADLESS_SHELL = os.getenv("PLAYWRIGHT_HEADLESS_SHELL", "true").lower() == "true"
+
+def _chromium_installed() -> bool:
+    """Check whether the Playwright Chromium build the submitter launches is already downloaded"""
+    browsers_path = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    cache_dir = Path(browsers_path) if browsers_path and browsers_path != "0" else Path.home() / ".cache" / "ms-playwright"
+    return any(cache_dir.glob("chromium_headless_shell-*" if HEADLESS_SHELL else "chromium-*"))
+
+def use_uvloop():
+    """Run asyncio on uvloop's libuv-based event loop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    print("✅ Using uvloop event loop")
+
+def use_dns_cache():
+    """Cache host lookups process-wide when DNS_CACHE_ENABLED is set in the environment"""
+    from app.config import config
+    if not config.DNS_CACHE_ENABLED:
+        return
+    from app.utils import install_dns_cache
+    install_dns_cache(config.DNS_CACHE_TTL)
+    print(f"✅ DNS cache enabled (ttl={config.DNS_CACHE_TTL}s)")
+
+def install_dependencies(force: bool = False):
+    """
+    Install required dependencies (skipped when the requirements file is unchanged since the last install)
+    Returns True if pip installed packages, so the caller can restart on them
+    """
+    # Files are read directly (a missing one raises) rather than stat-ed first and then read
+    # A lockfile already lists every package with its hash, so pip can skip dependency resolution
+    try:
+        requirements = REQUIREMENTS_LOCK.read_bytes()
+        pip_args = ["-r", str(REQUIREMENTS_LOCK), "--require-hashes", "--no-deps"]
+    except FileNotFoundError:
+        try:
+            requirements = Path("requirements.txt").read_bytes()
+        except FileNotFoundError:
+            print("❌ requirements.txt not found")
+            sys.exit(1)
+        pip_args = ["-r", "requirements.txt"]
     
-    # Check if requirements.txt exists
-    if not Path("requirements.txt").exists():
-        print("❌ requirements.txt not found")
-        sys.exit(1)
+    requirements_hash = hashlib.sha256(requirements).hexdigest()
+    try:
+        deps_current = not force and DEPS_HASH_FILE.read_text().strip() == requirements_hash
+    except FileNotFoundError:
+        deps_current = False
     
     try:
-        # Install dependencies
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
-        print("✅ Dependencies installed")
+        if deps_current:
+            print("✅ Dependencies up to date")
+            installed = False
+        else:
+            # Install dependencies
+            print("📦 Installing dependencies...")
+            subprocess.run([sys.executable, "-m", "pip", "install", "--disable-pip-version-check", *pip_args], 
+                          check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            DEPS_HASH_FILE.parent.mkdir(exist_ok=True)
+            DEPS_HASH_FILE.write_text(requirements_hash)
+            print("✅ Dependencies installed")
+            installed = True
         
         # Install Playwright browsers only if not skipped
-        if os.environ.get("PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD") != "1":
-            subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], 
-                          check=True, capture_output=True)
-            print("✅ Playwright browsers installed")
-        else:
+        if os.environ.get("PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD") == "1":
             print("⏭️ Skipping Playwright browser installation (PLAYWRIGHT_SKIP_BROWSER_DOWNLOAD=1)")
+        elif not force and _chromium_installed():
+            print("✅ Playwright browsers already installed")
+        else:
+            install_args = ["--only-shell", "chromium"] if HEADLESS_SHELL else ["chromium"]
+            subprocess.run([sys.executable, "-m", "playwright", "install", *install_args], 
+                          check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            print("✅ Playwright browsers installed")
+        
+        return installed
         
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to install dependencies: {e}")
+        # Progress output goes to /dev/null; only the tail of stderr is kept for the error report
+        if e.stderr:
+            print(e.stderr[-4096:].decode(errors="replace"))
         sys.exit(1)
 
 def check_env_file():
     """Check if .env file exists and has required keys"""
     env_file = Path(".env")
     
-    if not env_file.exists():
+    # Read and check .env file (one pass into KEY -> value; comments and blank lines skipped)
+    env = {}
+    try:
+        with open(env_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                env[key.strip()] = value.strip()
+    except FileNotFoundError:
         print("❌ .env file not found!")
         print("\n📝 Create a .env file with your API keys:")
         print("   OPENAI_API_KEY=your_openai_key_here")
@@ -72,16 +157,8 @@ def check_env_file():
         print("   STRIPE_SECRET_KEY=your_stripe_key_here (optional)")
         sys.exit(1)
     
-    # Read and check .env file
-    with open(env_file, 'r') as f:
-        content = f.read()
-        
     required_keys = ["OPENAI_API_KEY", "SERPER_API_KEY"]
-    missing_keys = []
-    
-    for key in required_keys:
-        if key not in content or f"{key}=" in content and not content.split(f"{key}=")[1].split('\n')[0].strip():
-            missing_keys.append(key)
+    missing_keys = [key for key in required_keys if not env.get(key)]
     
     if missing_keys:
         print(f"❌ Missing or empty API keys: {', '.join(missing_keys)}")
@@ -99,27 +176,66 @@ def create_directories():
 
 def main():
     """Main function - run the automated service"""
+    # Help needs none of the setup checks (or the agent's heavy imports), so it is answered first
+    if sys.argv[1:2] == ["help"]:
+        show_help()
+        return
+    
     print("🚀 RANKZEN AUTOMATED SEO OUTREACH TOOL")
     print("=" * 50)
     print("🎯 Simple, lightweight automation")
     print("=" * 50)
     print()
     
+    # Kept for a restart after installing dependencies; one-shot flags are dropped from it
+    restart_argv = [arg for arg in sys.argv if arg not in ("--force-install", "--clear-cache")]
+    
+    # --force-install reinstalls dependencies even when nothing changed
+    force_install = "--force-install" in sys.argv
+    if force_install:
+        sys.argv.remove("--force-install")
+    
+    # --clear-cache drops cached search results so discovery queries Serper afresh
+    if "--clear-cache" in sys.argv:
+        sys.argv.remove("--clear-cache")
+        shutil.rmtree(SERP_CACHE_DIR, ignore_errors=True)
+        print("🧹 Search result cache cleared")
+    
+    # --concurrency N caps how many sites are audited at once (default: AUDIT_WORKERS)
+    concurrency = None
+    if "--concurrency" in sys.argv:
+        i = sys.argv.index("--concurrency")
+        try:
+            concurrency = int(sys.argv[i + 1])
+        except (IndexError, ValueError):
+            print("❌ --concurrency needs a number, e.g. --concurrency 8")
+            sys.exit(1)
+        del sys.argv[i:i + 2]
+    
     # Setup checks
     check_python_version()
-    install_dependencies()
+    if install_dependencies(force=force_install):
+        # Start over in a fresh interpreter so newly installed packages (and their .pth hooks) are visible
+        print("🔄 Restarting with the new dependencies...")
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable] + restart_argv)
     check_env_file()
     create_directories()
+    use_uvloop()
+    use_dns_cache()
     
     # Check for command line arguments
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
         if command == "test":
-            asyncio.run(run_test_mode())
+            asyncio.run(run_test_mode(concurrency))
             return
-        elif command == "help":
-            show_help()
+        elif command == "daemon":
+            try:
+                asyncio.run(run_daemon(concurrency))
+            except KeyboardInterrupt:
+                print("\n🛑 Daemon stopped by user")
             return
     
     print()
@@ -140,9 +256,7 @@ def main():
     
     # Import and run the automated service
     try:
-        from automated_agent import AutomatedOutreachAgent
-        agent = AutomatedOutreachAgent()
-        asyncio.run(agent.run_continuous(cycle_interval_hours=0.1, max_sites_per_cycle=30))
+        asyncio.run(run_service(concurrency))
     except KeyboardInterrupt:
         print("\n🛑 Service stopped by user")
     except Exception as e:
@@ -157,7 +271,11 @@ def show_help():
     print("USAGE:")
     print("  python run_rankzen.py              # Start automated service")
     print("  python run_rankzen.py test         # Run test mode")
+    print("  python run_rankzen.py daemon       # Keep a warm agent running for repeated test runs")
     print("  python run_rankzen.py help         # Show this help")
+    print("  python run_rankzen.py --force-install  # Reinstall dependencies before starting")
+    print("  python run_rankzen.py --clear-cache    # Discard cached search results before starting")
+    print("  python run_rankzen.py --concurrency 8  # Audit up to 8 sites at once")
     print()
     print("FEATURES:")
     print("  🎯 Phase 1: Discovery, audit, outreach automation")
@@ -172,21 +290,114 @@ def show_help():
 
 
 
-async def run_test_mode():
+async def run_service(concurrency: int = None):
+    """Run the agent continuously; its pooled connections are closed on the way out"""
+    from automated_agent import AutomatedOutreachAgent
+    
+    # The first SIGTERM/SIGINT lets the running cycle finish, then the agent closes its sessions and
+    # browser; the handlers are removed on that first signal, so a second Ctrl+C interrupts at once
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGTERM, signal.SIGINT)
+    
+    def request_stop():
+        print("\n🛑 Stopping after the current cycle (Ctrl+C again to stop now)")
+        stop.set()
+        for sig in signals:
+            loop.remove_signal_handler(sig)
+    
+    for sig in signals:
+        try:
+            loop.add_signal_handler(sig, request_stop)
+        except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    
+    async with AutomatedOutreachAgent(concurrency=concurrency) as agent:
+        await agent.run_continuous(cycle_interval_hours=0.1, max_sites_per_cycle=30, stop_event=stop)
+    print("\n🛑 Service stopped")
+
+async def run_daemon(concurrency: int = None):
+    """Keep one agent (imports, sessions, browser) warm and run cycles sent over DAEMON_SOCKET"""
+    from automated_agent import AutomatedOutreachAgent
+    
+    # Refuse to take the socket path from a daemon that is already answering on it
+    try:
+        _, writer = await asyncio.open_unix_connection(str(DAEMON_SOCKET))
+    except OSError:
+        pass
+    else:
+        writer.close()
+        print(f"❌ A daemon is already running on {DAEMON_SOCKET}")
+        return
+    
+    async with AutomatedOutreachAgent(concurrency=concurrency) as agent:
+        agent.keep_browser_open = True
+        cycle_lock = asyncio.Lock()  # One cycle at a time; later requests wait their turn
+        
+        async def handle(reader, writer):
+            try:
+                request = json.loads(await reader.readline() or b'{}')
+                if request.get('cmd') in ('test', 'cycle'):
+                    async with cycle_lock:
+                        result = await agent.run_full_cycle(max_sites=int(request.get('max_sites', 5)))
+                else:
+                    result = {'error': f"Unknown command: {request.get('cmd')}"}
+            except Exception as e:
+                result = {'error': str(e)}
+            writer.write(json.dumps(result, default=str).encode() + b'\n')
+            await writer.drain()
+            writer.close()
+        
+        DAEMON_SOCKET.unlink(missing_ok=True)
+        # Owner-only socket: whoever can connect can start outreach cycles
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(handle, path=str(DAEMON_SOCKET))
+        finally:
+            os.umask(old_umask)
+        print(f"✅ Daemon listening on {DAEMON_SOCKET} (Ctrl+C to stop)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            DAEMON_SOCKET.unlink(missing_ok=True)
+
+async def _run_on_daemon(max_sites: int):
+    """Run a cycle on a warm daemon; None if no daemon is listening"""
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(DAEMON_SOCKET))
+    except (OSError, AttributeError):  # No socket, stale socket, or no Unix sockets on this platform
+        return None
+    try:
+        writer.write(json.dumps({'cmd': 'test', 'max_sites': max_sites}).encode() + b'\n')
+        await writer.drain()
+        result = json.loads(await reader.readline())
+    finally:
+        writer.close()
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+async def run_test_mode(concurrency: int = None):
     """Run test mode for quick verification"""
     print("🧪 TEST MODE")
     print("=" * 50)
     print()
     
     try:
-        from automated_agent import AutomatedOutreachAgent
-        agent = AutomatedOutreachAgent()
-        
         print("Testing automated agent with Phase 2 integration...")
         print("Running single cycle to demonstrate Phase 1 + Phase 2 workflow...")
         print()
         
-        result = await agent.run_full_cycle(max_sites=5)
+        result = await _run_on_daemon(max_sites=5)
+        if result is not None:
+            print("⚡ Ran on the warm daemon")
+            if concurrency is not None:
+                print("⚠️ --concurrency was ignored; the daemon uses the value it was started with")
+        else:
+            from automated_agent import AutomatedOutreachAgent
+            async with AutomatedOutreachAgent(concurrency=concurrency) as agent:
+                result = await agent.run_full_cycle(max_sites=5)
         
         if result['cycle_complete']:
             print("✅ Test cycle successful!")